@@ -1,27 +1,23 @@
-import boto3
 import json
+import os
 
-client = boto3.client('bedrock-runtime')
+from exportedge_common.bedrock import build_cached_payload, invoke_model_hedged, response_text
+from exportedge_common.emissions import annotate_emissions, lane_distance_km
+from exportedge_common.events import event_value
+from exportedge_common.measurements import order_measurements
+from exportedge_common.telemetry import instrument_stage
+from lane_cache import cached_quote
+from rate_engine import quote_order, quote_orders
 
-def lambda_handler(event, context):
-    # Extract necessary details from the event
+# 'rate_card' quotes locally from rate_cards.json and only asks the model for
+# lanes the card does not cover; 'bedrock' keeps the model-based path
+PRICING_ENGINE = os.environ.get('CARRIER_PRICING_ENGINE', 'rate_card')
 
-    # Prepare the payload for the Messages API
-    payload = {
-        "messages": [
-            {
-                "role": "user",
-                "content": f"""
-You are an AI carrier assistant. Retrieve shipping options from the following carriers: DHL, FedEx, UPS and Bluedart only. Provide all possible options based on the following details:
+# Static instructions, sent as the system prefix on every call (cached once long enough)
+SYSTEM_PROMPT = """
+You are an AI carrier assistant. Retrieve shipping options from the following carriers: DHL, FedEx, UPS and Bluedart only. Provide all possible options based on the order details in the user message:
 Price should range from 50RS to 1000RS only.And we are dealing with Electronics products only.
 We are shipping to three locations only USA,Australia and UK.
-Order Details:
-- Product Dimensions: {event['product_dimensions']}
-- Product Weight: {event['product_weight']}
-- Pickup Address: {event['warehouse_pickup_address']}
-- Delivery Address: {event['customer_delivery_address']}
-- Prime Member: {event['customer_prime_member']}
-- Hazard Classification: {event['hazard_classification']}
 
 Shipping Options Needed:
 1. Cost-effective option.
@@ -44,25 +40,29 @@ Respond ONLY with a well-formatted JSON object containing a list of shipping opt
 
 Do not include any additional text or explanations outside of the JSON object.
 """
-            }
-        ],
-        "max_tokens": 400,  # Adjust based on expected output size
-        "anthropic_version": "bedrock-2023-05-31"  # Replace with the correct version for your Claude model
-    }
-
-    # Call the Messages API
-    response = client.invoke_model(
-        modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',  # Replace with your actual model ID
-        body=json.dumps(payload),  # Pass the JSON payload
-        contentType='application/json',  # Required for Messages API
-        accept='application/json'  # Expect JSON response
-    )
-
-    # Parse the response
-    model_output = json.loads(response['body'].read().decode('utf-8'))
+
+
+def price_with_model(event):
+    """Ask the model for shipping options (legacy path and fallback for unlisted lanes)."""
+    # Extract necessary details from the event
+    order_details = f"""
+Order Details:
+- Product Dimensions: {event['product_dimensions']}
+- Product Weight: {event['product_weight']}
+- Pickup Address: {event['warehouse_pickup_address']}
+- Delivery Address: {event['customer_delivery_address']}
+- Prime Member: {event['customer_prime_member']}
+- Hazard Classification: {event['hazard_classification']}
+"""
+
+    # Prepare the payload for the Messages API
+    payload = build_cached_payload(SYSTEM_PROMPT, order_details, max_tokens=400)
+
+    # Call the Messages API (shared client with retries and rate limiting)
+    model_output = invoke_model_hedged(payload)
 
     # Extract the assistant's response
-    assistant_response = model_output['content'][0]['text'].strip()
+    assistant_response = response_text(model_output)
 
     # Ensure the assistant response is parsed as JSON
     try:
@@ -70,6 +70,42 @@ Do not include any additional text or explanations outside of the JSON object.
     except json.JSONDecodeError:
         raise ValueError("The AI did not return a valid JSON response.")
 
+    return parsed_response
+
+
+def with_calculated_emissions(order, parsed_response):
+    """Replace the model's CO₂ estimates with the shared calculator's when lane and weight are known."""
+    options = parsed_response.get('shipping_options') if isinstance(parsed_response, dict) else None
+    distance_km = lane_distance_km(event_value(order, 'warehouse_pickup_address', ''),
+                                   event_value(order, 'customer_delivery_address', ''))
+    chargeable_kg = order_measurements(order).get('chargeable_weight_kg')
+    if isinstance(options, list) and distance_km is not None and chargeable_kg is not None:
+        annotate_emissions([option for option in options if isinstance(option, dict)], distance_km, chargeable_kg)
+    return parsed_response
+
+
+@instrument_stage('CarrierPricing')
+def lambda_handler(event, context):
+    # Batch mode: quote every order in event['orders'] in one vectorized pass
+    if isinstance(event.get('orders'), list):
+        if PRICING_ENGINE == 'rate_card':
+            quotes = quote_orders(event['orders'])
+        else:
+            quotes = [None] * len(event['orders'])
+        event['quoted_orders'] = [
+            {"shipping_options": options} if options is not None
+            else with_calculated_emissions(order, cached_quote(order, lambda order=order: price_with_model(order)))
+            for order, options in zip(event['orders'], quotes)
+        ]
+        return event
+
+    shipping_options = quote_order(event) if PRICING_ENGINE == 'rate_card' else None
+    if shipping_options is not None:
+        parsed_response = {"shipping_options": shipping_options}
+    else:
+        # Model quotes are shared per lane (region, country, weight band, hazmat, prime)
+        parsed_response = with_calculated_emissions(event, cached_quote(event, lambda: price_with_model(event)))
+
     # Add the carrier pricing details to the event
     event['carrier_pricing'] = parsed_response
     return event
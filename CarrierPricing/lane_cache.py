@@ -0,0 +1,87 @@
+import bisect
+import copy
+import os
+import re
+import threading
+
+from exportedge_common.cache import build_cache, fingerprint
+from exportedge_common.events import event_value, hazard_flag
+from exportedge_common.measurements import order_measurements
+from exportedge_common.telemetry import record_metrics
+from rate_engine import destination_zone
+
+# Quotes for a lane stay fresh for the TTL, then are served stale (and
+# refreshed in the background) for up to LANE_CACHE_STALE_SECONDS more
+lane_cache = build_cache(
+    'carrier-lane',
+    ttl_seconds=int(os.environ.get('LANE_CACHE_TTL_SECONDS', 6 * 3600)),
+    table_name=os.environ.get('LANE_CACHE_TABLE'),
+    max_entries=int(os.environ.get('LANE_CACHE_MAX_ENTRIES', 512)),
+    stale_seconds=int(os.environ.get('LANE_CACHE_STALE_SECONDS', 24 * 3600))
+)
+
+# Upper edges (kg) of the chargeable-weight bands that share a quote
+WEIGHT_BANDS_KG = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+_POSTCODE = re.compile(r'\b[\w-]*\d[\w-]*\b')
+
+# Container-wide counters, logged with every lookup
+lane_cache_stats = {'lookups': 0, 'fresh': 0, 'stale': 0, 'miss': 0}
+_stats_lock = threading.Lock()
+
+
+def weight_band(chargeable_kg):
+    index = bisect.bisect_left(WEIGHT_BANDS_KG, chargeable_kg)
+    if index >= len(WEIGHT_BANDS_KG):
+        return f">{WEIGHT_BANDS_KG[-1]:g}kg"
+    low = WEIGHT_BANDS_KG[index - 1] if index else 0
+    return f"{low:g}-{WEIGHT_BANDS_KG[index]:g}kg"
+
+
+def pickup_region(address):
+    """The last two parts of a pickup address (e.g. state and country), without postcodes."""
+    parts = [_POSTCODE.sub('', part).strip() for part in str(address).split(',')]
+    return ', '.join([part for part in parts if part][-2:])
+
+
+def destination_country(address):
+    """Rate-card zone for the address, else its last component."""
+    parts = [part.strip() for part in str(address).split(',') if part.strip()]
+    return destination_zone(address) or (parts[-1] if parts else '')
+
+
+def lane_key(order):
+    """Cache key for an order's lane, or None when its chargeable weight or hazard label is unknown."""
+    chargeable_kg = order_measurements(order).get('chargeable_weight_kg')
+    hazardous = hazard_flag(order)
+    if chargeable_kg is None or hazardous is None:
+        return None
+    return fingerprint({
+        'pickup_region': pickup_region(event_value(order, 'warehouse_pickup_address', '')),
+        'destination': destination_country(event_value(order, 'customer_delivery_address', '')),
+        'weight_band': weight_band(chargeable_kg),
+        'hazardous': hazardous,
+        'prime': str(event_value(order, 'customer_prime_member', '')).strip().lower() in ('yes', 'true', 'y', '1')
+    })
+
+
+def cached_quote(order, loader):
+    """Return the lane's cached quote, calling ``loader`` on a miss (or in the background when stale)."""
+    key = lane_key(order)
+    if key is None:
+        return loader()
+    value, status, entry = lane_cache.get_or_refresh(key, loader)
+    age = entry.age if entry is not None else 0.0
+    with _stats_lock:
+        lane_cache_stats['lookups'] += 1
+        lane_cache_stats[status] += 1
+        hit_ratio = (lane_cache_stats['fresh'] + lane_cache_stats['stale']) / lane_cache_stats['lookups']
+    print(f"Lane quote cache {status} (age {age:.0f}s, hit ratio {hit_ratio:.2f})")
+    record_metrics(
+        {'Stage': 'CarrierPricing'},
+        [('LaneCacheHit', 'Count'), ('LaneCacheStale', 'Count'), ('LaneCacheAgeSeconds', 'Seconds')],
+        {'LaneCacheHit': int(status != 'miss'), 'LaneCacheStale': int(status == 'stale'),
+         'LaneCacheAgeSeconds': round(age, 1)}
+    )
+    # The memory tier hands out the stored object; callers get their own copy
+    return copy.deepcopy(value)
@@ -0,0 +1,176 @@
+import json
+import os
+
+import numpy as np
+
+from exportedge_common.emissions import country_of, factor_per_kg_km, lane_distance_km
+from exportedge_common.events import event_value, hazard_flag
+from exportedge_common.measurements import order_measurements
+
+RATE_CARD_PATH = os.environ.get(
+    'CARRIER_RATE_CARD_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rate_cards.json')
+)
+
+# Option types in the order they are picked; each pick excludes carriers already chosen,
+# so an order never lists the same carrier twice (downstream stages key on carrier name)
+OPTION_TYPES = ('Cost-effective', 'Urgent', 'Balanced', 'Best Option')
+
+# Weights over normalized (price, delivery days, CO₂) for the scored option types
+BALANCED_WEIGHTS = np.array([0.5, 0.5, 0.0])
+BEST_OPTION_WEIGHTS = np.array([0.4, 0.3, 0.3])
+
+
+def destination_zone(address):
+    """Rate-card zone for a delivery address, or None when the lane is not on the card."""
+    country = country_of(address)
+    return country if country in rate_card.zones else None
+
+
+class RateCard:
+    """Carrier × service × zone × weight-break tables held as NumPy arrays.
+
+    ``quote`` prices every service for a batch of orders in one pass and
+    picks the Cost-effective, Urgent, Balanced and Best Option services per
+    order, from distinct carriers, using the price, delivery-time and CO₂ matrices.
+    """
+
+    def __init__(self, card):
+        self.currency = card['currency']
+        self.zones = list(card['zones'])
+        self.breaks = np.asarray(card['weight_breaks_kg'], dtype=float)
+        services = card['services']
+        self.carriers = [s['carrier'] for s in services]
+        self.services = [s['service'] for s in services]
+        self.modes = [s['mode'] for s in services]
+        # same_carrier[i, j]: services i and j belong to the same carrier
+        carrier_ids = np.array([self.carriers.index(c) for c in self.carriers])
+        self.same_carrier = carrier_ids[:, None] == carrier_ids[None, :]
+        # Shapes: (services, zones, breaks), (services, zones), (services, zones, 2)
+        self.rates = np.array([[s['rates'][z] for z in self.zones] for s in services], dtype=float)
+        self.per_kg_over = np.array([[s['per_kg_over'][z] for z in self.zones] for s in services], dtype=float)
+        self.transit = np.array([[s['transit_days'][z] for z in self.zones] for s in services], dtype=float)
+        # kg CO₂ per kg per great-circle km, from the shared emissions tables
+        self.emission_factors = np.array([factor_per_kg_km(mode) for mode in self.modes], dtype=float)
+        self.hazmat_allowed = np.array([s['hazmat'] for s in services], dtype=bool)
+        hazmat = card['hazmat']
+        self.hazmat_multiplier = 1 + hazmat['surcharge_percent'] / 100
+        self.hazmat_flat = np.array([hazmat['flat'][mode] for mode in self.modes], dtype=float)
+        self.hazmat_extra_days = hazmat['extra_days']
+
+    @classmethod
+    def load(cls, path=RATE_CARD_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def quote(self, weights_kg, zone_indexes, hazardous, distances_km):
+        """Return ``(price, days_min, days_max, co2, allowed)`` arrays of shape (orders, services)."""
+        weights_kg = np.asarray(weights_kg, dtype=float)
+        distances_km = np.asarray(distances_km, dtype=float)
+        zone_indexes = np.asarray(zone_indexes, dtype=int)
+        hazardous = np.asarray(hazardous, dtype=bool)
+
+        # First break at or above the weight; heavier shipments pay per kg over the last break
+        break_indexes = np.minimum(np.searchsorted(self.breaks, weights_kg), len(self.breaks) - 1)
+        over_kg = np.maximum(weights_kg - self.breaks[-1], 0.0)
+        price = (self.rates[:, zone_indexes, break_indexes]
+                 + self.per_kg_over[:, zone_indexes] * over_kg).T
+        price = np.where(hazardous[:, None], price * self.hazmat_multiplier + self.hazmat_flat, price)
+
+        extra_days = np.where(hazardous, self.hazmat_extra_days, 0)[:, None]
+        days_min = self.transit[:, zone_indexes, 0].T + extra_days
+        days_max = self.transit[:, zone_indexes, 1].T + extra_days
+        co2 = (weights_kg * distances_km)[:, None] * self.emission_factors[None, :]
+        allowed = ~hazardous[:, None] | self.hazmat_allowed[None, :]
+        return price, days_min, days_max, co2, allowed
+
+    def select(self, price, days_min, days_max, co2, allowed):
+        """Pick one service per option type for every order, each from a different carrier; -1 where none is left."""
+        days = (days_min + days_max) / 2
+        norm = np.stack([_normalize_rows(m, allowed) for m in (price, days, co2)], axis=-1)
+        scores = {
+            'Cost-effective': np.where(allowed, price, np.inf),
+            'Urgent': np.where(allowed, days + norm[..., 0] * 1e-3, np.inf),
+            'Balanced': np.where(allowed, norm @ BALANCED_WEIGHTS, np.inf),
+            'Best Option': np.where(allowed, norm @ BEST_OPTION_WEIGHTS, np.inf),
+        }
+        rows = np.arange(price.shape[0])
+        available = allowed.copy()
+        picks = {}
+        for option_type in OPTION_TYPES:
+            score = np.where(available, scores[option_type], np.inf)
+            choice = np.argmin(score, axis=1)
+            found = np.isfinite(score[rows, choice])
+            picks[option_type] = np.where(found, choice, -1)
+            available[rows[found]] &= ~self.same_carrier[choice[found]]
+        return picks
+
+    def shipping_options(self, weights_kg, zone_indexes, hazardous, distances_km):
+        """``shipping_options`` lists, one per order, in the structure CarrierPricing emits."""
+        price, days_min, days_max, co2, allowed = self.quote(weights_kg, zone_indexes, hazardous, distances_km)
+        picks = self.select(price, days_min, days_max, co2, allowed)
+        results = []
+        for row in range(price.shape[0]):
+            options = []
+            for option_type in OPTION_TYPES:
+                column = picks[option_type][row]
+                if column < 0:
+                    continue
+                options.append({
+                    "carrier": self.carriers[column],
+                    "service": self.services[column],
+                    "option_type": option_type,
+                    "price": f"{price[row, column]:.2f}",
+                    "delivery_time": f"{days_min[row, column]:.0f}-{days_max[row, column]:.0f} days",
+                    "co2_emissions": f"{co2[row, column]:.2f} kg",
+                    "co2_kg": round(float(co2[row, column]), 3),
+                    "mode": self.modes[column]
+                })
+            results.append(options)
+        return results
+
+
+def _normalize_rows(matrix, allowed):
+    """Min-max normalize each row over its allowed services."""
+    masked = np.where(allowed, matrix, np.nan)
+    with np.errstate(all='ignore'):
+        low = np.nanmin(masked, axis=1, keepdims=True)
+        span = np.nanmax(masked, axis=1, keepdims=True) - low
+        normalized = np.where(span > 0, (matrix - low) / span, 0.0)
+    return np.where(allowed, normalized, 1.0)
+
+
+# Loaded once per container at cold start
+rate_card = RateCard.load()
+
+
+def order_inputs(order):
+    """``(chargeable_kg, zone_index, hazardous, distance_km)`` for an order, or None when the card cannot price it.
+
+    Orders without a clean hazard label are not priced here, so they never get
+    non-hazmat carriers and rates by default.
+    """
+    delivery_address = event_value(order, 'customer_delivery_address', '')
+    zone = destination_zone(delivery_address)
+    chargeable_kg = order_measurements(order).get('chargeable_weight_kg')
+    hazardous = hazard_flag(order)
+    if zone is None or chargeable_kg is None or hazardous is None:
+        return None
+    distance_km = lane_distance_km(event_value(order, 'warehouse_pickup_address', ''), delivery_address)
+    return chargeable_kg, rate_card.zones.index(zone), hazardous, distance_km
+
+
+def quote_orders(orders):
+    """Quote a batch of orders in one vectorized pass; None for orders the card cannot price."""
+    inputs = [order_inputs(order) for order in orders]
+    priced = [i for i, values in enumerate(inputs) if values is not None]
+    results = [None] * len(orders)
+    if priced:
+        weights, zones, hazardous, distances = zip(*(inputs[i] for i in priced))
+        for i, options in zip(priced, rate_card.shipping_options(weights, zones, hazardous, distances)):
+            results[i] = options
+    return results
+
+
+def quote_order(order):
+    """``shipping_options`` for one order, or None when the card cannot price it."""
+    return quote_orders([order])[0]
@@ -1,9 +1,16 @@
-import boto3
 import json
+import os
 
-client = boto3.client('bedrock-runtime')
+from exportedge_common.bedrock import invoke_model_coalesced, response_text
+from exportedge_common.telemetry import instrument_stage
+from pricing_rules import price_order, price_orders
 
-def lambda_handler(event, context):
+# 'rules' prices locally from PRICING_RULES; 'bedrock' keeps the model-based path
+PRICING_ENGINE = os.environ.get('CUSTOMER_PRICING_ENGINE', 'rules')
+
+
+def price_with_model(event):
+    """Ask the model to apply the pricing rules (legacy path)."""
     # Prepare the payload for the Messages API
     payload = {
         "messages": [
@@ -39,21 +46,26 @@ Respond ONLY with a JSON object containing the following keys:
         "anthropic_version": "bedrock-2023-05-31"  # Replace with the correct version for your Claude model
     }
 
-    # Call the Messages API
-    response = client.invoke_model(
-        modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',  # Replace with your model ID
-        body=json.dumps(payload),  # Pass the JSON payload
-        contentType='application/json',  # Required for Messages API
-        accept='application/json'  # Expect JSON response
-    )
-
-    # Parse the response
-    model_output = json.loads(response['body'].read().decode('utf-8'))
-    
-   
+    # Call the Messages API (shared client with retries and rate limiting)
+    model_output = invoke_model_coalesced(payload)
+
     # Extract the assistant's response
-    assistant_response = model_output['content'][0]['text']
-    parsed_response = json.loads(assistant_response)  # Parse the JSON object from the AI's response
+    assistant_response = response_text(model_output)
+    return json.loads(assistant_response)  # Parse the JSON object from the AI's response
+
+
+@instrument_stage('CustomerPricingLogic')
+def lambda_handler(event, context):
+    # Batch mode: price every order in event['orders'] in one invocation
+    if isinstance(event.get('orders'), list):
+        event['priced_orders'] = price_orders(event['orders'])
+        return event
+
+    if PRICING_ENGINE == 'bedrock':
+        parsed_response = price_with_model(event)
+    else:
+        parsed_response = price_order(event)
+
     # Add the pricing details to the event
     event['final_price'] = parsed_response.get('final_price', '0')
     event['delivery_type'] = parsed_response.get('delivery_type', 'Unknown')
@@ -0,0 +1,59 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from exportedge_common.events import event_value
+from exportedge_common.measurements import parse_price, parse_quantity
+
+# Evaluated top to bottom; the first rule whose conditions all match wins.
+# A condition maps an event field to the accepted (case-insensitive) values.
+PRICING_RULES = [
+    {
+        "name": "prime_member",
+        "when": {"customer_prime_member": ["yes", "true", "y", "1"]},
+        "discount_percent": "10",
+        "delivery_type": "Express"
+    },
+    {
+        "name": "standard",
+        "when": {},
+        "discount_percent": "0",
+        "delivery_type": "Standard"
+    }
+]
+
+CENTS = Decimal('0.01')
+
+
+def match_rule(order, rules=PRICING_RULES):
+    for rule in rules:
+        if all(str(event_value(order, field, '')).strip().lower() in accepted
+               for field, accepted in rule['when'].items()):
+            return rule
+    raise ValueError("No pricing rule matched the order.")
+
+
+def price_order(order, rules=PRICING_RULES):
+    """Return ``final_price``, ``delivery_type`` and ``discount_applied`` for one order.
+
+    Raises ValueError for a price that is not positive or a quantity that is
+    not a positive whole number.
+    """
+    rule = match_rule(order, rules)
+    total = parse_price(event_value(order, 'product_price')) * parse_quantity(event_value(order, 'product_quantity'))
+    discount = Decimal(rule['discount_percent'])
+    final_price = (total * (100 - discount) / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return {
+        "final_price": str(final_price),
+        "delivery_type": rule['delivery_type'],
+        "discount_applied": f"{discount.normalize():f}%"
+    }
+
+
+def price_orders(orders, rules=PRICING_RULES):
+    """Price a batch of orders in one call; an order that cannot be priced gets an ``error`` entry."""
+    priced = []
+    for order in orders:
+        try:
+            priced.append(price_order(order, rules))
+        except ValueError as e:
+            priced.append({"error": str(e)})
+    return priced
@@ -1,6 +1,8 @@
 import boto3
 import json
 
+from exportedge_common.measurements import parse_measurements
+
 s3_client = boto3.client('s3')
 
 def lambda_handler(event, context):
@@ -11,6 +13,9 @@ def lambda_handler(event, context):
     # Read the file content from S3
     response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
     order_details = json.loads(response['Body'].read())
+
+    # Typed cm/kg measurements so downstream stages do not re-parse the text fields
+    order_details['measurements'] = parse_measurements(order_details)
     
     # Return the extracted order details
     return order_details
@@ -1,15 +1,43 @@
-import boto3
-import json
+import os
 
-client = boto3.client('bedrock-runtime')
+from exportedge_common.cache import build_cache, fingerprint
+from exportedge_common.events import event_value
+from exportedge_common.telemetry import instrument_stage
+from hazard_routing import HAZARD_LABELS, classify
 
+# Product attributes that determine the classification; repeat SKUs share a key
+HAZARD_KEY_FIELDS = ('product_name', 'product_specifications', 'product_dimensions')
+
+# Warm-container LRU in front of an optional shared DynamoDB table
+hazard_cache = build_cache(
+    'hazard',
+    ttl_seconds=int(os.environ.get('HAZARD_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    table_name=os.environ.get('HAZARD_CACHE_TABLE')
+)
+
+
+def hazard_cache_key(event):
+    """Canonical fingerprint of the product fields used to classify an order."""
+    return fingerprint({field: event_value(event, field, '') for field in HAZARD_KEY_FIELDS})
+
+
+@instrument_stage('HazardClassification')
 def lambda_handler(event, context):
-    # Prepare the input payload for the Messages API
-    payload = {
-        "messages": [
-            {
-                "role": "user",
-                "content": f"""
+    cache_key = hazard_cache_key(event)
+
+    # Explicit invalidation, e.g. after a product's specifications are corrected
+    if event.get('invalidate_hazard_cache'):
+        hazard_cache.invalidate(cache_key)
+        print(f"Hazard cache entry invalidated: {cache_key}")
+        return {"status": "success", "message": "Hazard classification cache entry invalidated"}
+
+    cached, tier = hazard_cache.lookup(cache_key)
+    if cached is not None:
+        print(f"Hazard classification cache hit ({tier}): {cached.value}")
+        event['hazard_classification'] = cached.value
+        return event
+
+    prompt = f"""
 You are an AI Dangerous Goods Specialist or Hazardous Materials (HazMat) Professional for logistics shipping. Classify whether a product is hazardous or non-hazardous based on global shipping safety standards. Do not include any explanation or reasoning. Only output "HAZARDOUS" or "NON-HAZARDOUS".
 
 Product Details:
@@ -19,26 +47,17 @@ Product Details:
 - Weight: {event['product_weight']}
 - Quantity: {event['product_quantity']}
 """
-            }
-        ],
-        "max_tokens": 200,  # Maximum tokens to generate
-        "anthropic_version": "bedrock-2023-05-31"  # Replace with the correct model version
-    }
-
-    # Call the Messages API
-    response = client.invoke_model(
-        modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',  # Replace with your actual model ID
-        body=json.dumps(payload),  # Pass the JSON payload
-        contentType='application/json',  # Required for Messages API
-        accept='application/json'  # Expect JSON response
+
+    # Small model first; escalate on risk keywords or an unclean label
+    assistant_response, _ = classify(
+        prompt, f"{event['product_name']} {event['product_specifications']}"
     )
-    
-    # Parse the response
-    model_output = json.loads(response['body'].read().decode('utf-8'))
-    
-    # Extract the assistant's response
-    assistant_response = model_output['content'][0]['text']
     print(assistant_response)
+
+    # Only cache clean labels so a malformed answer is retried next time
+    if assistant_response in HAZARD_LABELS:
+        hazard_cache.put(cache_key, assistant_response)
+
     # Add hazard classification to the event
     event['hazard_classification'] = assistant_response
     return event
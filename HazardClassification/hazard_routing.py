@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import threading
+
+from exportedge_common.bedrock import DEFAULT_MODEL_ID, build_payload, invoke_model_coalesced, response_text
+from exportedge_common.telemetry import record_metrics
+
+HAZARD_LABELS = ('HAZARDOUS', 'NON-HAZARDOUS')
+
+# Small model for the constrained first pass; the large model only sees escalations
+FAST_MODEL_ID = os.environ.get('HAZARD_FAST_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+ESCALATION_MODEL_ID = os.environ.get('HAZARD_ESCALATION_MODEL_ID', DEFAULT_MODEL_ID)
+FAST_MAX_TOKENS = 8
+ESCALATION_MAX_TOKENS = 200
+
+# Products mentioning these go straight to the large model: they are the
+# classic dangerous-goods cases where a wrong NON-HAZARDOUS is costly
+RISK_KEYWORDS = re.compile(
+    r'\b(batter(y|ies)|lithium|li-?ion|li-?po|power ?banks?|aerosols?|sprays?|flammable|'
+    r'combustible|explosives?|fireworks?|corrosive|acids?|solvents?|perfumes?|fuel|gas|'
+    r'compressed|magnet(s|ic)?|toxic|radioactive|dry ice|paints?)\b',
+    re.IGNORECASE
+)
+
+# Container-wide routing counters, logged with every decision
+routing_stats = {'calls': 0, 'fast': 0, 'escalated_keyword': 0, 'escalated_unclean': 0}
+_stats_lock = threading.Lock()
+
+
+def normalize_label(text):
+    """Map model output such as ``'Non-hazardous.'`` to a clean label, or None."""
+    label = re.sub(r'[^A-Z-]', '', text.upper().replace(' ', '-'))
+    return label if label in HAZARD_LABELS else None
+
+
+def risk_keywords(product_text):
+    return sorted({match.group(0).lower() for match in RISK_KEYWORDS.finditer(product_text)})
+
+
+def _record(route, model_id, keywords=None):
+    with _stats_lock:
+        routing_stats['calls'] += 1
+        routing_stats[route] += 1
+        escalation_rate = 1 - routing_stats['fast'] / routing_stats['calls']
+    decision = {"route": route, "model_id": model_id, "escalation_rate": round(escalation_rate, 3)}
+    if keywords:
+        decision["keywords"] = keywords
+    print(f"Hazard routing: {json.dumps(decision)}")
+    record_metrics(
+        {'Stage': 'HazardClassification'},
+        [('HazardEscalations', 'Count')],
+        {'HazardEscalations': int(route != 'fast')},
+        decision
+    )
+    return decision
+
+
+def classify(prompt, product_text):
+    """Classify with the small model first; return ``(answer, decision)``.
+
+    The request escalates to the large model when the product text matches a
+    risk keyword or the small model's answer is not a clean label. ``answer``
+    is a clean label whenever either model produced one.
+    """
+    keywords = risk_keywords(product_text)
+    if not keywords:
+        fast_payload = build_payload(prompt, FAST_MAX_TOKENS)
+        fast_payload["temperature"] = 0
+        fast_answer = response_text(invoke_model_coalesced(fast_payload, model_id=FAST_MODEL_ID))
+        label = normalize_label(fast_answer)
+        if label is not None:
+            return label, _record('fast', FAST_MODEL_ID)
+        print(f"Fast hazard model returned an unclean label: {fast_answer!r}")
+
+    escalation_payload = build_payload(prompt, ESCALATION_MAX_TOKENS)
+    answer = response_text(invoke_model_coalesced(escalation_payload, model_id=ESCALATION_MODEL_ID))
+    route = 'escalated_keyword' if keywords else 'escalated_unclean'
+    return normalize_label(answer) or answer, _record(route, ESCALATION_MODEL_ID, keywords)
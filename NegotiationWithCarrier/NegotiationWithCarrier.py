@@ -1,38 +1,24 @@
-import boto3
-import json
-import re
+import os
 
-client = boto3.client('bedrock-runtime')
+from exportedge_common.bedrock import (
+    build_cached_payload, invoke_model_hedged, invoke_model_stream_hedged, response_text
+)
+from exportedge_common.json_stream import extract_json, extract_json_stream
+from exportedge_common.telemetry import instrument_stage
+from negotiation_fanout import negotiate_all
 
-def lambda_handler(event, context):
-    try:
-        # Extract carrier pricing from the event
-        carrier_pricing = event.get('carrier_pricing', {}).get('shipping_options', [])
-        
-        # Validate carrier_pricing structure
-        if not isinstance(carrier_pricing, list):
-            raise ValueError("carrier_pricing must be a list of dictionaries.")
-        
-        # Format the shipping options into a user-friendly list
-        options = "\n".join([
-            f"{idx + 1}. Carrier: {option.get('carrier', 'Unknown')}, Price: {option.get('price', 'Unknown')}, "
-            f"Delivery Time: {option.get('delivery_time', 'Unknown')}, CO₂ Emissions: {option.get('co2_emissions', 'Unknown')}"
-            for idx, option in enumerate(carrier_pricing)
-            if isinstance(option, dict)  # Ensure each entry is a dictionary
-        ])
-        
-        # Prepare the prompt with realistic rules and context
-        prompt = f"""
-You are an AI logistics negotiation assistant representing a seller. Negotiate individually with each carrier based on their shipping options, balancing cost, delivery speed, and environmental impact.
+# Stream the model output into the incremental JSON extractor (set to 'false' to buffer)
+STREAM_RESPONSE = os.environ.get('NEGOTIATION_STREAM_RESPONSE', 'true').lower() == 'true'
 
-### Shipping Options:
-{options}
+# 'single' negotiates with every carrier in one call; 'per_carrier' fans out one
+# smaller call per shipping option concurrently and ranks the results locally
+NEGOTIATION_MODE = os.environ.get('NEGOTIATION_MODE', 'single')
 
-### Key Details:
-- Prime Membership: {'Yes' if event.get('customer_prime_member', {}).get('S', 'No') == 'Yes' else 'No'}.
-- Hazard Classification: {event.get('hazard_classification', 'Unknown')}.
-- Bulk Quantity: {event.get('product_quantity', {}).get('S', 'Unknown')} units.
-- Sustainability Focus: Prefer carriers with lower CO₂ emissions for cost-effective and balanced options.
+# Static negotiation rules, sent as the system prefix on every call (cached once long enough)
+SYSTEM_PROMPT = """
+You are an AI logistics negotiation assistant representing a seller. Negotiate individually with each carrier based on the shipping options in the user message, balancing cost, delivery speed, and environmental impact.
+
+Sustainability Focus: Prefer carriers with lower CO₂ emissions for cost-effective and balanced options.
 
 ### Rules for Negotiation:
 1. Negotiate individually with each carrier for better rates.
@@ -51,80 +37,62 @@ You are an AI logistics negotiation assistant representing a seller. Negotiate i
 **Provide only the JSON response with the following structure, enclosed in triple backticks and labeled as `json`, without any additional text:**
 
 ```json
-{{
+{
   "negotiated_prices": [...],
-  "chat": {{...}},
-  "recommendation": {{...}}
-}}
+  "chat": {...},
+  "recommendation": {...}
+}
 """
+
+@instrument_stage('NegotiationWithCarrier')
+def lambda_handler(event, context):
+    try:
+        # Extract carrier pricing from the event
+        carrier_pricing = event.get('carrier_pricing', {}).get('shipping_options', [])
         
-        payload = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "max_tokens": 5000,  # Adjust if needed
-            "anthropic_version": "bedrock-2023-05-31"  # Replace with the correct version
-        }
-
-        # Call the Messages API
-        response = client.invoke_model(
-            modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',  # Replace with your actual model ID
-            body=json.dumps(payload),  # Pass the JSON payload
-            contentType='application/json',  # Required
-            accept='application/json'  # Expect JSON response
-        )
-
-        # Parse the response
-        model_output = json.loads(response['body'].read().decode('utf-8'))
-
-        # Access the text content correctly
-        if 'completion' in model_output:
-            assistant_response = model_output['completion'].strip()
-        elif 'content' in model_output and isinstance(model_output['content'], list):
-            assistant_response = model_output['content'][0].get('text', '').strip()
-        else:
-            raise ValueError("The model output structure is unexpected or 'content' field is missing.")
-
-        # Extract JSON code block from the assistant's response
-        json_match = re.search(r'```json\s*(\{.*?\})\s*```', assistant_response, re.DOTALL)
-        if not json_match:
-            raise ValueError("The AI did not return a valid JSON response.")
-
-        json_string = json_match.group(1).strip()
-        def clean_json_string(s):
-            # Remove newline characters
-            #s = s.replace('\n', ' ')
-            # Remove any control characters
-            s = re.sub(r'[\x00-\x1F\x7F]', '', s)
-            s = re.sub('        ',' ',s)
-            s = re.sub('      ','',s)
-            s = re.sub('    ',' ',s)
-            s = re.sub('  ',' ',s)
-            s = re.sub('} ] }','}]}',s)
-            s = re.sub('} ]','}]',s)
-            s = re.sub(r'\[ {', '[{', s)
-            
-            
-            return s
-        json_string_cleaned = clean_json_string(json_string)
+        # Validate carrier_pricing structure
+        if not isinstance(carrier_pricing, list):
+            raise ValueError("carrier_pricing must be a list of dictionaries.")
         
-        print(json_string_cleaned)
+        # Format the shipping options into a user-friendly list
+        options = "\n".join([
+            f"{idx + 1}. Carrier: {option.get('carrier', 'Unknown')}, Price: {option.get('price', 'Unknown')}, "
+            f"Delivery Time: {option.get('delivery_time', 'Unknown')}, CO₂ Emissions: {option.get('co2_emissions', 'Unknown')}"
+            for idx, option in enumerate(carrier_pricing)
+            if isinstance(option, dict)  # Ensure each entry is a dictionary
+        ])
         
-        print(json.loads(json_string_cleaned))
-        # Attempt to parse the JSON string
-        try:
-            parsed_response = json.loads(json_string)
-        except json.JSONDecodeError as e:
-            # Log the error and the problematic strings
-            print(f"Error decoding JSON: {str(e)}")
-            print("Assistant Response:")
-            print(assistant_response)
-            print("Extracted JSON String:")
-            print(json_string)
-            raise ValueError(f"Error decoding JSON: {str(e)}")
+        is_prime = event.get('customer_prime_member', {}).get('S', 'No') == 'Yes'
+        key_details = f"""
+### Key Details:
+- Prime Membership: {'Yes' if is_prime else 'No'}.
+- Hazard Classification: {event.get('hazard_classification', 'Unknown')}.
+- Bulk Quantity: {event.get('product_quantity', {}).get('S', 'Unknown')} units.
+"""
+
+        if event.get('negotiation_mode', NEGOTIATION_MODE) == 'per_carrier':
+            shipping_options = [option for option in carrier_pricing if isinstance(option, dict)]
+            negotiated_prices, chat, recommendation = negotiate_all(shipping_options, key_details, is_prime)
+            event['negotiated_prices'] = negotiated_prices
+            event['chat'] = chat
+            event['recommendation'] = recommendation
+            return event
+
+        # Per-order details; the static rules live in the cached SYSTEM_PROMPT
+        order_details = f"""
+### Shipping Options:
+{options}
+{key_details}"""
+
+        payload = build_cached_payload(SYSTEM_PROMPT, order_details, max_tokens=5000)
+
+        if STREAM_RESPONSE:
+            # Parse the JSON while the response streams in; reading stops once the object closes
+            parsed_response = extract_json_stream(invoke_model_stream_hedged(payload))
+        else:
+            # Call the Messages API (shared client with retries and rate limiting)
+            model_output = invoke_model_hedged(payload)
+            parsed_response = extract_json(response_text(model_output))
 
         # Validate parsed_response structure
         if not isinstance(parsed_response, dict):
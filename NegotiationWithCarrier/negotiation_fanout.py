@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from exportedge_common.bedrock import build_cached_payload, invoke_model_stream_hedged
+from exportedge_common.json_stream import extract_json_stream
+from exportedge_common.measurements import parse_days, parse_price, parse_weight
+from exportedge_common.ranking import weighted_best
+from exportedge_common.telemetry import submit_in_stage
+
+# Upper bound on concurrent per-carrier Bedrock calls from one invocation
+MAX_CONCURRENCY = int(os.environ.get('NEGOTIATION_MAX_CONCURRENCY', 4))
+CARRIER_MAX_TOKENS = int(os.environ.get('NEGOTIATION_CARRIER_MAX_TOKENS', 1200))
+
+# Ranking weights for the local recommendation (lower price/time/CO₂ is better)
+RANKING_WEIGHTS = {'price': 0.40, 'time': 0.35, 'emissions': 0.25}
+PRIME_RANKING_WEIGHTS = {'price': 0.30, 'time': 0.50, 'emissions': 0.20}
+
+# Static per-carrier rules, sent as the system prefix on every call (cached once long enough)
+CARRIER_SYSTEM_PROMPT = """
+You are an AI logistics negotiation assistant representing a seller. Negotiate with the single carrier option in the user message, balancing cost, delivery speed, and environmental impact.
+
+### Rules for Negotiation:
+1. Ask for discounts based on bulk orders or Prime membership.
+2. Ask the carrier to justify costs for expedited shipping or sustainability-related emissions.
+3. Prioritize sustainability and cost-effective solutions.
+4. Finalize the negotiation with an explicit rate and reasoning. Keep the conversation to at most six short turns.
+
+**Provide only the JSON response with the following structure, enclosed in triple backticks and labeled as `json`, without any additional text:**
+
+```json
+{
+  "carrier": "<carrier name>",
+  "original_price": "<price>",
+  "negotiated_price": "<price>",
+  "discount": "<percentage>",
+  "reasoning": "<one or two sentences>",
+  "chat": [{"speaker": "Seller", "message": "..."}, {"speaker": "<carrier name>", "message": "..."}]
+}
+"""
+
+def parsed(parse, value):
+    """``parse(value)`` as a float, or None when the value is missing or malformed."""
+    try:
+        return float(parse(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def option_co2(option):
+    """kg CO₂ for an option: the numeric ``co2_kg`` CarrierPricing adds, else its ``co2_emissions`` text."""
+    co2 = option.get('co2_kg')
+    return float(co2) if isinstance(co2, (int, float)) else parsed(parse_weight, option.get('co2_emissions'))
+
+
+def option_label(option, options):
+    """Carrier name, qualified by option type when a carrier has several options."""
+    carrier = option.get('carrier', 'Unknown')
+    if sum(1 for other in options if other.get('carrier') == carrier) > 1:
+        return f"{carrier} ({option.get('option_type', 'Option')})"
+    return carrier
+
+
+def negotiate_with_carrier(option, key_details):
+    """Run one smaller negotiation call for a single shipping option."""
+    order_details = f"""
+### Shipping Option:
+Carrier: {option.get('carrier', 'Unknown')}, Option Type: {option.get('option_type', 'Unknown')}, Price: {option.get('price', 'Unknown')}, Delivery Time: {option.get('delivery_time', 'Unknown')}, CO₂ Emissions: {option.get('co2_emissions', 'Unknown')}, Mode: {option.get('mode', 'Unknown')}
+{key_details}"""
+    payload = build_cached_payload(CARRIER_SYSTEM_PROMPT, order_details, max_tokens=CARRIER_MAX_TOKENS)
+    return extract_json_stream(invoke_model_stream_hedged(payload))
+
+
+def negotiate_all(options, key_details, is_prime=False):
+    """Negotiate with every option concurrently and merge the results.
+
+    Returns ``(negotiated_prices, chat, recommendation)`` in the same shape as
+    the single-call negotiation. A carrier whose call fails keeps its original
+    price so one slow or broken negotiation cannot fail the whole stage.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(options)))) as executor:
+        futures = [submit_in_stage(executor, negotiate_with_carrier, option, key_details) for option in options]
+
+    negotiated_prices = []
+    chat = {}
+    for option, future in zip(options, futures):
+        label = option_label(option, options)
+        try:
+            result = future.result()
+            if not isinstance(result, dict):
+                raise ValueError("Parsed response is not a valid dictionary.")
+        except Exception as e:
+            print(f"Negotiation with {label} failed: {e}")
+            result = {"negotiated_price": option.get('price'), "discount": "0%",
+                      "reasoning": "Negotiation unavailable; original price kept.", "chat": []}
+        negotiated_prices.append({
+            "carrier": option.get('carrier', 'Unknown'),
+            "option_type": option.get('option_type'),
+            "original_price": option.get('price'),
+            "negotiated_price": result.get('negotiated_price', option.get('price')),
+            "discount": result.get('discount', "0%"),
+            "reasoning": result.get('reasoning', "")
+        })
+        chat[label] = result.get('chat', [])
+
+    return negotiated_prices, chat, rank_options(options, negotiated_prices, is_prime)
+
+
+def rank_options(options, negotiated_prices, is_prime=False):
+    """Pick the recommendation locally from negotiated price, delivery time and CO₂."""
+    rows = []
+    for option, negotiated in zip(options, negotiated_prices):
+        price = parsed(parse_price, negotiated.get('negotiated_price'))
+        if price is None:
+            price = parsed(parse_price, option.get('price'))
+        if price is not None:
+            rows.append((option, negotiated, {
+                'price': price,
+                'time': parsed(parse_days, option.get('delivery_time')),
+                'emissions': option_co2(option),
+            }))
+    best = weighted_best([criteria for _, _, criteria in rows], PRIME_RANKING_WEIGHTS if is_prime else RANKING_WEIGHTS)
+    if best is None:
+        return "No recommendation provided."
+    option, negotiated, _ = rows[best]
+    return {
+        "carrier": option.get('carrier'),
+        "option_type": option.get('option_type'),
+        "negotiated_price": negotiated.get('negotiated_price'),
+        "delivery_time": option.get('delivery_time'),
+        "co2_emissions": option.get('co2_emissions'),
+        "mode": option.get('mode'),
+        "reasoning": "Best weighted balance of negotiated price, delivery time and CO₂ emissions"
+                     + (" (delivery speed weighted higher for Prime)." if is_prime else ".")
+    }
@@ -0,0 +1,134 @@
+"""Micro-benchmark: per-order Groovy scripts vs. bytecode vs. scripts with bindings.
+
+Run against a local Gremlin Server (e.g. ``docker run -p 8182:8182 tinkerpop/gremlin-server``):
+
+    python benchmark_queries.py ws://localhost:8182/gremlin 200
+
+Each variant upserts the same carriers for ``orders`` distinct order IDs and
+reports per-query latency. Interpolated scripts differ for every order, so the
+server compiles each one; bytecode and bound scripts keep one shape.
+
+The write-scaling section times a whole order write (Order, Carriers and
+SERVES edges) as 1 + 2N sequential traversals vs. one batched mergeV/mergeE
+traversal, for growing option counts N.
+"""
+import json
+import sys
+import time
+
+from gremlin_python.driver import client
+
+import order_graph
+from neptune_client import message_serializer
+
+CARRIERS = [
+    ('DHL', 450.0, '3-5 days', 12.4, 'Air'),
+    ('FedEx', 430.0, '2-4 days', 12.1, 'Air'),
+    ("O'Brien Freight", 180.0, '28-35 days', 0.6, 'Sea'),
+]
+
+BOUND_CARRIER_SCRIPT = (
+    "g.V().has('Carrier', 'name', name).fold().coalesce(unfold(), addV('Carrier'))"
+    ".property('name', name).property('base_price', price).property('delivery_time', delivery_time)"
+    ".property('co2_emissions', emissions).property('transport_mode', mode)"
+)
+
+
+def interpolated_carrier_script(name, price, delivery_time, emissions, mode):
+    # The previous handler's approach: values spliced into the Groovy source
+    name = name.replace("'", "\\'")
+    return (
+        f"g.V().has('Carrier', 'name', '{name}').fold().coalesce(unfold(), addV('Carrier'))"
+        f".property('name', '{name}').property('base_price', {price}).property('delivery_time', '{delivery_time}')"
+        f".property('co2_emissions', {emissions}).property('transport_mode', '{mode}')"
+    )
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def run_variant(gremlin_client, orders, submit):
+    latencies = []
+    for order in range(orders):
+        for name, price, delivery_time, emissions, mode in CARRIERS:
+            # Vary a value per order the way real quotes do
+            price = price + order % 97
+            started = time.perf_counter()
+            submit(gremlin_client, name, price, delivery_time, emissions, mode)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'queries': len(latencies),
+        'p50_ms': round(_percentile(latencies, 0.5), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'total_s': round(sum(latencies) / 1000, 2),
+    }
+
+
+VARIANTS = {
+    'interpolated_script': lambda c, *args: c.submit(interpolated_carrier_script(*args)).all().result(),
+    'bound_script': lambda c, name, price, delivery_time, emissions, mode: c.submit(
+        BOUND_CARRIER_SCRIPT,
+        {'name': name, 'price': price, 'delivery_time': delivery_time, 'emissions': emissions, 'mode': mode}
+    ).all().result(),
+    'bytecode': lambda c, *args: c.submit(order_graph.upsert_carrier(*args).bytecode).all().result(),
+}
+
+
+def _options(count):
+    return [
+        {"name": f"Carrier {i}", "price": 100.0 + i, "delivery_time": '3-5 days', "emissions": 1.0 + i / 10,
+         "transport_mode": 'Air', "negotiated_price": 95.0 + i}
+        for i in range(count)
+    ]
+
+
+def write_sequential(gremlin_client, order_id, carriers):
+    gremlin_client.submit(order_graph.upsert_order(order_id, False, False).bytecode).all().result()
+    for c in carriers:
+        args = (c['name'], c['price'], c['delivery_time'], c['emissions'], c['transport_mode'])
+        gremlin_client.submit(order_graph.upsert_carrier(*args).bytecode).all().result()
+        gremlin_client.submit(order_graph.upsert_serves(
+            c['name'], order_id, c['negotiated_price'], c['delivery_time'], c['transport_mode']
+        ).bytecode).all().result()
+
+
+def write_batched(gremlin_client, order_id, carriers):
+    for batch in order_graph.upsert_order_batches(order_id, False, False, carriers, 25):
+        gremlin_client.submit(batch.bytecode).all().result()
+
+
+def run_write_scaling(gremlin_client, orders, option_counts=(3, 10, 30, 100)):
+    results = {}
+    for count in option_counts:
+        carriers = _options(count)
+        for name, write in (('sequential', write_sequential), ('batched', write_batched)):
+            latencies = []
+            for order in range(orders):
+                started = time.perf_counter()
+                write(gremlin_client, f'bench-{name}-{count}-{order}', carriers)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[f'{name}_{count}_options'] = {
+                'p50_ms': round(_percentile(latencies, 0.5), 2),
+                'p95_ms': round(_percentile(latencies, 0.95), 2),
+            }
+    return results
+
+
+def main(argv):
+    url = argv[0] if argv else 'ws://localhost:8182/gremlin'
+    orders = int(argv[1]) if len(argv) > 1 else 200
+    gremlin_client = client.Client(url, 'g', message_serializer=message_serializer())
+    try:
+        # Warm the connection pool so the first variant does not pay the handshake
+        gremlin_client.submit('g.inject(1)').all().result()
+        results = {name: run_variant(gremlin_client, orders, submit) for name, submit in VARIANTS.items()}
+        results['write_scaling'] = run_write_scaling(gremlin_client, max(1, orders // 10))
+    finally:
+        gremlin_client.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
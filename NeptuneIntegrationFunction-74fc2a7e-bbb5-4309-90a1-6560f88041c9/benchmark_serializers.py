@@ -0,0 +1,80 @@
+"""Offline benchmark of Gremlin wire formats on recommendation-query results.
+
+    python benchmark_serializers.py 2000
+
+Encodes a realistic ``recommendations`` response (one projection map per
+carrier, as traversers) in GraphSON 2, GraphSON 3 and GraphBinary, then reports
+the payload size and the time the driver takes to decode it.
+"""
+import json
+import sys
+import time
+import uuid
+
+from gremlin_python.driver import serializer
+from gremlin_python.process.traversal import Traverser
+from gremlin_python.structure.io import graphbinaryV1
+
+from neptune_client import SERIALIZERS, normalize_result
+
+CARRIERS = [
+    ('DHL', 'Air'), ('DHL Ocean', 'Sea'), ('FedEx', 'Air'), ('FedEx Economy', 'Air'),
+    ('UPS', 'Air'), ('UPS Expedited', 'Air'), ('Bluedart', 'Air'), ('Bluedart Sea', 'Sea'),
+]
+
+# GraphSON 2 is measured for reference only; the client rejects it (no merge maps)
+BENCHMARKED = {**SERIALIZERS, 'graphsonv2': serializer.GraphSONSerializersV2d0}
+
+
+def recommendation_results():
+    return [
+        Traverser({
+            'carrier': name,
+            'details': {'price': 400.0 + 37.5 * i, 'delivery_time': f'{2 + i}-{4 + i} days',
+                        'emissions': round(12.4 / (i + 1), 3), 'mode': mode}
+        })
+        for i, (name, mode) in enumerate(CARRIERS)
+    ]
+
+
+def encode_response(name, message_serializer, data):
+    """Response frame bytes as the server would send them for ``data``."""
+    request_id = uuid.uuid4()
+    if name == 'graphbinary':
+        ba = bytearray([0x81, 0x00])
+        ba.extend(request_id.bytes)
+        ba.extend(graphbinaryV1.int32_pack(200))
+        ba.extend(b'\x00' + graphbinaryV1.int32_pack(0))  # status message ''
+        ba.extend(graphbinaryV1.int32_pack(0))  # status attributes {}
+        ba.extend(graphbinaryV1.int32_pack(0))  # result meta {}
+        message_serializer._graphbinary_writer.to_dict(data, ba)
+        return bytes(ba)
+    writer = message_serializer.standard._writer
+    return json.dumps({
+        'requestId': str(request_id),
+        'status': {'code': 200, 'message': '', 'attributes': writer.to_dict({})},
+        'result': {'data': writer.to_dict(data), 'meta': writer.to_dict({})},
+    }).encode('utf-8')
+
+
+def main(argv):
+    iterations = int(argv[0]) if argv else 2000
+    data = recommendation_results()
+    results = {}
+    for name, serializer_class in BENCHMARKED.items():
+        message_serializer = serializer_class()
+        payload = encode_response(name, message_serializer, data)
+        decoded = message_serializer.deserialize_message(payload)['result']['data']
+        assert normalize_result(decoded) == normalize_result(data), name
+        started = time.perf_counter()
+        for _ in range(iterations):
+            message_serializer.deserialize_message(payload)
+        results[name] = {
+            'payload_bytes': len(payload),
+            'decode_us': round((time.perf_counter() - started) / iterations * 1e6, 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
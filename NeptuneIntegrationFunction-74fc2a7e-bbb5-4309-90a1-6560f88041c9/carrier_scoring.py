@@ -0,0 +1,152 @@
+"""Vectorized carrier scoring for Neptune recommendations.
+
+    python carrier_scoring.py 100000   # time a backtest-sized batch
+"""
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+SCORING_PROFILES_PATH = os.environ.get(
+    'SCORING_PROFILES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_profiles.json')
+)
+
+_DAYS = re.compile(r'\d+(?:\.\d+)?')
+
+
+class ScoringModel:
+    """Weighted price/time/emissions/service scores over whole arrays of options.
+
+    Weights start from ``base`` and each active profile (hazmat, prime, eco,
+    urgent, ...) adds its adjustments; profiles can be switched per option, so
+    one call scores many orders. Price, delivery days and CO₂ are min-max
+    normalized within each order's options (lower is better), so no fixed caps
+    are needed and real kg CO₂ values stay in range.
+    """
+
+    def __init__(self, criteria, base, profiles, service):
+        self.criteria = list(criteria)
+        self.base = self._vector(base)
+        self.profiles = {name: self._vector(adjustment) for name, adjustment in profiles.items()}
+        self.service = service
+
+    @classmethod
+    def load(cls, path=SCORING_PROFILES_PATH):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def _vector(self, weights):
+        return np.array([weights.get(criterion, 0.0) for criterion in self.criteria])
+
+    def weights(self, n, active):
+        """``(n, criteria)`` weights; ``active`` maps profile name to a bool or per-option bool array."""
+        weights = np.tile(self.base, (n, 1))
+        for name, mask in active.items():
+            if name not in self.profiles:
+                raise ValueError(f"Unknown scoring profile {name!r}")
+            weights += np.broadcast_to(np.asarray(mask, dtype=float), (n,))[:, None] * self.profiles[name]
+        return np.clip(weights, 0.0, None)
+
+    def service_scores(self, hazmat_certified, prime_applied, n):
+        return (
+            self.service['base']
+            + self.service['hazmat_certified'] * np.broadcast_to(np.asarray(hazmat_certified, dtype=float), (n,))
+            + self.service['prime_applied'] * np.broadcast_to(np.asarray(prime_applied, dtype=float), (n,))
+        )
+
+    def score(self, price, days, co2, groups=None, active=None, hazmat_certified=False, prime_applied=False):
+        """Scores (0-100) for every option; ``groups`` gives each option's order index (default: one order)."""
+        price = np.asarray(price, dtype=float)
+        n = len(price)
+        groups = np.zeros(n, dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+        criteria = np.column_stack([
+            relative_scores(price, groups),
+            relative_scores(days, groups),
+            relative_scores(co2, groups),
+            self.service_scores(hazmat_certified, prime_applied, n),
+        ])
+        return np.round((criteria * self.weights(n, active or {})).sum(axis=1) * 100, 2)
+
+
+def relative_scores(values, groups):
+    """1 for the lowest value in each group down to 0 for the highest (1 when all are equal)."""
+    values = np.asarray(values, dtype=float)
+    size = groups.max() + 1 if len(groups) else 0
+    low = np.full(size, np.inf)
+    high = np.full(size, -np.inf)
+    np.minimum.at(low, groups, values)
+    np.maximum.at(high, groups, values)
+    spread = (high - low)[groups]
+    return np.where(spread > 0, (high[groups] - values) / np.where(spread > 0, spread, 1), 1.0)
+
+
+def delivery_days(delivery_times):
+    """Midpoint days for strings like ``'3-5 days'`` (NaN when unparseable)."""
+    days = np.full(len(delivery_times), np.nan)
+    for i, text in enumerate(delivery_times):
+        numbers = _DAYS.findall(str(text))
+        if numbers:
+            days[i] = sum(map(float, numbers[:2])) / len(numbers[:2])
+    return days
+
+
+def top_k(scores, k=None, groups=None):
+    """Option indices ranked by descending score, the best ``k`` per group (all when ``k`` is None)."""
+    scores = np.asarray(scores)
+    groups = np.zeros(len(scores), dtype=np.intp) if groups is None else np.asarray(groups)
+    order = np.lexsort((-scores, groups))
+    if k is None:
+        return order
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups, side='left')
+    return order[rank < k]
+
+
+scoring_model = ScoringModel.load()
+
+
+def rank_recommendations(recommendations, is_hazmat, is_prime, profiles=(), k=None):
+    """Set ``score`` on each recommendation and return them best first (top ``k``).
+
+    Options with an unparseable price, delivery time or CO₂ figure score 0.
+    """
+    if not recommendations:
+        return []
+    price = np.array([float(r.get('price', np.nan)) for r in recommendations])
+    days = delivery_days([r.get('delivery_time', '') for r in recommendations])
+    co2 = np.array([float(r.get('co2_kg', np.nan)) for r in recommendations])
+    valid = ~(np.isnan(price) | np.isnan(days) | np.isnan(co2))
+    active = {'hazmat': is_hazmat, 'prime': is_prime}
+    active.update({name: True for name in profiles})
+
+    scores = np.zeros(len(recommendations))
+    if valid.any():
+        scores[valid] = scoring_model.score(
+            price[valid], days[valid], co2[valid], active=active,
+            hazmat_certified=is_hazmat, prime_applied=is_prime
+        )
+    for recommendation, score in zip(recommendations, scores):
+        recommendation['score'] = float(score)
+    return [recommendations[i] for i in top_k(scores, k)]
+
+
+def main(argv):
+    options = int(argv[0]) if argv else 100000
+    rng = np.random.default_rng(7)
+    groups = np.sort(rng.integers(0, max(1, options // 4), options))
+    started = time.perf_counter()
+    scores = scoring_model.score(
+        rng.uniform(50, 1000, options), rng.uniform(2, 40, options), rng.uniform(0.1, 50, options),
+        groups=groups, active={'hazmat': rng.random(options) < 0.2, 'prime': rng.random(options) < 0.5}
+    )
+    best = top_k(scores, 2, groups)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"options": options, "orders": int(groups.max()) + 1, "top2_selected": len(best),
+                      "seconds": round(elapsed, 4)}))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
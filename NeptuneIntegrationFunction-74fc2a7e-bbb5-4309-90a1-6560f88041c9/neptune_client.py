@@ -0,0 +1,191 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from decimal import Decimal
+from enum import Enum
+
+import aiohttp
+from gremlin_python.driver import client, serializer
+from gremlin_python.driver.protocol import GremlinServerError
+from gremlin_python.process.traversal import Traverser
+
+NEPTUNE_ENDPOINT = os.environ.get(
+    'NEPTUNE_ENDPOINT', 'db-neptune-1.cluster-cro660am4yd1.us-west-2.neptune.amazonaws.com'
+)
+NEPTUNE_PORT = int(os.environ.get('NEPTUNE_PORT', 8182))
+NEPTUNE_POOL_SIZE = int(os.environ.get('NEPTUNE_POOL_SIZE', 4))
+NEPTUNE_MAX_WORKERS = int(os.environ.get('NEPTUNE_MAX_WORKERS', 4))
+
+# Wire format for requests and results. GraphBinary is the default for its
+# smaller payloads (1325 B against 2905 B for GraphSON 3 on a recommendation
+# result, see benchmark_serializers.py), at a higher decode cost in the
+# pure-Python driver. GraphSON 2 is not offered: it cannot carry the
+# mergeV/mergeE maps (T/Direction keys) used for writes.
+SERIALIZERS = {
+    'graphbinary': serializer.GraphBinarySerializersV1,
+    'graphsonv3': serializer.GraphSONSerializersV3d0,
+}
+NEPTUNE_SERIALIZER = os.environ.get('NEPTUNE_SERIALIZER', 'graphbinary').lower()
+
+# A frozen Lambda container can come back with its sockets silently dropped;
+# a client idle for longer than this is pinged before it is reused
+NEPTUNE_HEALTHCHECK_SECONDS = float(os.environ.get('NEPTUNE_HEALTHCHECK_SECONDS', 60))
+NEPTUNE_HEALTHCHECK_TIMEOUT = float(os.environ.get('NEPTUNE_HEALTHCHECK_TIMEOUT', 3))
+
+# Failures that mean the socket is gone, as opposed to a bad query or value
+TRANSPORT_ERRORS = (OSError, asyncio.TimeoutError, concurrent.futures.TimeoutError, aiohttp.ClientError)
+
+# One client per warm container, reused across invocations
+_client = None
+_last_used = 0.0
+_client_lock = threading.Lock()
+client_stats = {'connects': 0, 'reconnects': 0, 'health_checks': 0}
+
+
+def message_serializer(name=None):
+    name = (name or NEPTUNE_SERIALIZER).lower()
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown NEPTUNE_SERIALIZER {name!r}; expected one of {', '.join(SERIALIZERS)}")
+    return SERIALIZERS[name]()
+
+
+# Fail the cold start on a bad setting rather than the first query
+message_serializer()
+
+
+def _connect():
+    started = time.perf_counter()
+    gremlin_client = client.Client(
+        f'wss://{NEPTUNE_ENDPOINT}:{NEPTUNE_PORT}/gremlin',
+        'g',
+        pool_size=NEPTUNE_POOL_SIZE,
+        max_workers=NEPTUNE_MAX_WORKERS,
+        message_serializer=message_serializer()
+    )
+    client_stats['connects'] += 1
+    print(f"Neptune Client Initialized in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return gremlin_client
+
+
+def _healthy(gremlin_client):
+    client_stats['health_checks'] += 1
+    try:
+        gremlin_client.submit('g.inject(1)').all().result(timeout=NEPTUNE_HEALTHCHECK_TIMEOUT)
+        return True
+    except Exception as e:
+        print(f"Neptune health check failed: {e}")
+        return False
+
+
+def get_client():
+    """Return the container's Gremlin client, creating it lazily and replacing it if unhealthy."""
+    global _client, _last_used
+    with _client_lock:
+        if _client is not None and (
+            _client.is_closed()
+            or (time.time() - _last_used > NEPTUNE_HEALTHCHECK_SECONDS and not _healthy(_client))
+        ):
+            _close(_client)
+            _client = None
+            client_stats['reconnects'] += 1
+        if _client is None:
+            _client = _connect()
+        _last_used = time.time()
+        return _client
+
+
+def reset_client(stale_client=None):
+    """Drop the container's client (only if it is still ``stale_client``, when given)."""
+    global _client
+    with _client_lock:
+        if _client is None or (stale_client is not None and _client is not stale_client):
+            return
+        _close(_client)
+        _client = None
+        client_stats['reconnects'] += 1
+
+
+def _close(gremlin_client):
+    try:
+        gremlin_client.close()
+    except Exception as e:
+        print(f"Error closing Neptune client: {e}")
+
+
+def normalize_result(value):
+    """Plain, JSON-friendly Python for a deserialized Gremlin value.
+
+    Unwraps traversers and turns ``T.id``/``T.label`` map keys into strings,
+    sets and tuples into lists and BigDecimals into floats, so projection maps
+    read the same whichever serializer is configured.
+    """
+    if isinstance(value, Traverser):
+        return normalize_result(value.object)
+    if isinstance(value, dict):
+        return {(k.name if isinstance(k, Enum) else k): normalize_result(v) for k, v in value.items()}
+    if isinstance(value, (list, set, tuple)):
+        return [normalize_result(v) for v in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+
+def _flatten(results):
+    # Bytecode requests come back as traversers; expand each by its bulk
+    flat = []
+    for result in results:
+        bulk = result.bulk if isinstance(result, Traverser) else 1
+        flat.extend([normalize_result(result)] * bulk)
+    return flat
+
+
+def is_transport_error(error):
+    """True for a dropped or closed connection; the driver reports closed sockets as bare errors."""
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    return type(error) in (Exception, RuntimeError) and 'closed' in str(error).lower()
+
+
+def execute_query(query, retries=3, bindings=None):
+    """Execute a Gremlin traversal (sent as bytecode) or script with retry logic.
+
+    Server errors (e.g. concurrent modification) are retried on the same
+    client and transport errors, including failing to connect, on a fresh
+    one. Anything else (a value the serializer cannot encode, a bug in the
+    caller) is raised at once.
+    """
+    message = getattr(query, 'bytecode', query)
+    for attempt in range(retries):
+        gremlin_client = None
+        try:
+            gremlin_client = get_client()
+            return _flatten(gremlin_client.submit(message, bindings).all().result())
+        except Exception as e:
+            print(f"Query failed: {query}, Error: {e}")
+            if is_transport_error(e):
+                # No client to drop when connecting was what failed
+                if gremlin_client is not None:
+                    reset_client(gremlin_client)
+            elif not isinstance(e, GremlinServerError):
+                raise
+            if attempt < retries - 1:
+                print("Retrying query...")
+                time.sleep(2 ** attempt)
+            else:
+                raise e
+
+
+def warm_up():
+    """Open (or health-check) the connection pool ahead of real traffic."""
+    started = time.perf_counter()
+    execute_query('g.inject(1)')
+    return {
+        "status": "success",
+        "message": "Neptune client warm",
+        "warmup_ms": round((time.perf_counter() - started) * 1000, 1),
+        "client_stats": dict(client_stats)
+    }
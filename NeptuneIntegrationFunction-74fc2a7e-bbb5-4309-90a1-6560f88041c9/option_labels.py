@@ -0,0 +1,12 @@
+# Upper base_price bounds for each option type; anything above is Urgent
+OPTION_TYPE_THRESHOLDS = ((300, 'Cost-effective'), (500, 'Balanced'))
+OPTION_TYPE_DEFAULT = 'Urgent'
+
+
+def option_type(base_price):
+    """Cost-effective/Balanced/Urgent label for a carrier's base price."""
+    for upper, label in OPTION_TYPE_THRESHOLDS:
+        if base_price < upper:
+            return label
+    return OPTION_TYPE_DEFAULT
+
@@ -0,0 +1,141 @@
+from gremlin_python.process.graph_traversal import GraphTraversalSource, __
+from gremlin_python.process.traversal import CardinalityValue, Direction, Merge, P, T, TraversalStrategies
+from gremlin_python.structure.graph import Graph
+
+from option_labels import OPTION_TYPE_DEFAULT, OPTION_TYPE_THRESHOLDS, option_type
+
+# Traversals are built locally and sent as bytecode. Values travel as typed
+# arguments, so there is nothing to escape and Neptune sees the same traversal
+# shape for every order instead of compiling a new Groovy script each time.
+g = GraphTraversalSource(Graph(), TraversalStrategies())
+
+
+def order_vertex_id(order_id):
+    return f'Order_{order_id}'
+
+
+def upsert_order(order_id, is_hazmat, is_prime):
+    return g.V().has('Order', 'id', order_vertex_id(order_id)).fold().coalesce(
+        __.unfold(),
+        __.add_v('Order')
+        .property('id', order_vertex_id(order_id))
+        .property('hazmat', str(is_hazmat).lower())
+        .property('prime', str(is_prime).lower())
+    )
+
+
+def upsert_carrier(name, price, delivery_time, emissions, transport_mode):
+    return (
+        g.V().has('Carrier', 'name', name).fold().coalesce(
+            __.unfold(),
+            __.add_v('Carrier')
+        )
+        .property('name', name)
+        .property('base_price', price)
+        .property('delivery_time', delivery_time)
+        .property('co2_emissions', emissions)
+        .property('transport_mode', transport_mode)
+        .property('option_type', option_type(price))
+    )
+
+
+def upsert_serves(carrier_name, order_id, negotiated_price, delivery_time, transport_mode):
+    return (
+        g.V().has('Carrier', 'name', carrier_name).as_('c')
+        .V().has('Order', 'id', order_vertex_id(order_id))
+        .coalesce(
+            __.in_e('SERVES').where(__.out_v().as_('c')),
+            __.add_e('SERVES').from_('c')
+        )
+        .property('negotiated_price', negotiated_price)
+        .property('delivery_time', delivery_time)
+        .property('transport_mode', transport_mode)
+    )
+
+
+def upsert_order_with_carriers(order_id, is_hazmat, is_prime, carriers):
+    """One traversal that upserts the Order, every Carrier and every SERVES edge.
+
+    ``carriers`` are dicts with ``name``, ``price``, ``delivery_time``,
+    ``emissions``, ``transport_mode`` and ``negotiated_price``. Carrier and edge
+    properties are overwritten on match (single cardinality), matching the
+    per-query upserts above; the Order keeps its properties from creation.
+    ``onCreate`` maps only add properties: they inherit the match criteria.
+    """
+    traversal = g.merge_v({T.label: 'Order', 'id': order_vertex_id(order_id)}).option(
+        Merge.on_create, {'hazmat': str(is_hazmat).lower(), 'prime': str(is_prime).lower()}
+    ).as_('order')
+    for index, carrier in enumerate(carriers):
+        carrier_props = {
+            'base_price': carrier['price'],
+            'delivery_time': carrier['delivery_time'],
+            'co2_emissions': carrier['emissions'],
+            'transport_mode': carrier['transport_mode'],
+            # Classified once here so reads never scan carriers to threshold base_price
+            'option_type': option_type(carrier['price']),
+        }
+        edge_props = {
+            'negotiated_price': carrier['negotiated_price'],
+            'delivery_time': carrier['delivery_time'],
+            'transport_mode': carrier['transport_mode'],
+            # Per-order copy: the Carrier vertex is shared and re-priced by later orders
+            'option_type': carrier_props['option_type'],
+        }
+        traversal = (
+            traversal
+            .merge_v({T.label: 'Carrier', 'name': carrier['name']})
+            .option(Merge.on_create, carrier_props)
+            .option(Merge.on_match, {k: CardinalityValue.single(v) for k, v in carrier_props.items()})
+            .as_(f'carrier{index}')
+            .merge_e({T.label: 'SERVES', Direction.OUT: Merge.out_v, Direction.IN: Merge.in_v})
+            .option(Merge.out_v, __.select(f'carrier{index}'))
+            .option(Merge.in_v, __.select('order'))
+            .option(Merge.on_create, edge_props)
+            .option(Merge.on_match, edge_props)
+        )
+    return traversal.select('order').count()
+
+
+def upsert_order_batches(order_id, is_hazmat, is_prime, carriers, chunk_size):
+    """``upsert_order_with_carriers`` traversals for ``carriers`` in chunks of ``chunk_size``."""
+    chunks = [carriers[i:i + chunk_size] for i in range(0, len(carriers), chunk_size)] or [[]]
+    return [upsert_order_with_carriers(order_id, is_hazmat, is_prime, chunk) for chunk in chunks]
+
+
+def _price_threshold_label():
+    # Fallback for quotes written before option_type was stored
+    label = __.constant(OPTION_TYPE_DEFAULT)
+    for upper, name in reversed(OPTION_TYPE_THRESHOLDS):
+        label = __.choose(__.out_v().values('base_price').is_(P.lt(upper)), __.constant(name), label)
+    return label
+
+
+def option_types(order_id):
+    """Stored option types of the carriers serving one order (not every carrier in the graph)."""
+    return (
+        g.V().has('Order', 'id', order_vertex_id(order_id))
+        .in_e('SERVES')
+        .project('name', 'option_type')
+        .by(__.out_v().values('name'))
+        .by(__.coalesce(__.values('option_type'), _price_threshold_label()))
+        .dedup()
+    )
+
+
+def recommendations(order_id):
+    return (
+        g.V().has('Order', 'id', order_vertex_id(order_id))
+        .in_e('SERVES')
+        .as_('e')
+        .out_v()
+        .project('carrier', 'details')
+        .by(__.values('name'))
+        .by(
+            __.project('price', 'delivery_time', 'emissions', 'mode')
+            .by(__.select('e').values('negotiated_price'))
+            .by(__.select('e').values('delivery_time'))
+            .by(__.values('co2_emissions'))
+            .by(__.values('transport_mode'))
+        )
+        .dedup()
+    )
@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from exportedge_common.events import event_value
+from exportedge_common.pipeline import MERGE_ALL, Node, Pipeline, load_module
+
+NEPTUNE_DIR = 'NeptuneIntegrationFunction-74fc2a7e-bbb5-4309-90a1-6560f88041c9'
+
+PRODUCT_FIELDS = (
+    'product_name', 'product_specifications', 'product_dimensions',
+    'product_weight', 'product_quantity'
+)
+
+
+def stage_path(*parts):
+    return os.path.join(ROOT, *parts)
+
+
+def predict_hazard_classification(event):
+    """Cheap prior for speculative CarrierPricing: the hazard cache, else keyword rules.
+
+    Most orders are NON-HAZARDOUS electronics, so CarrierPricing can start
+    alongside HazardClassification and is only rerun when the prior was wrong.
+    """
+    hazard = load_module(stage_path('HazardClassification', 'HazardClassification.py'))
+    cached, _ = hazard.hazard_cache.lookup(hazard.hazard_cache_key(event))
+    if cached is not None:
+        return cached.value
+    routing = load_module(stage_path('HazardClassification', 'hazard_routing.py'))
+    product_text = f"{event_value(event, 'product_name', '')} {event_value(event, 'product_specifications', '')}"
+    return 'HAZARDOUS' if routing.risk_keywords(product_text) else 'NON-HAZARDOUS'
+
+
+# The order flow, declared in the original Step Functions order. Dependencies are
+# derived from the fields each stage reads and writes, so CustomerPricingLogic
+# runs alongside HazardClassification instead of after it.
+ORDER_NODES = [
+    Node.from_file(
+        'ExtractOrderDetails', stage_path('ExtractOrderDetails', 'ExtractOrderDetails.py'),
+        inputs=('s3_bucket', 's3_key'),
+        outputs=(MERGE_ALL,)
+    ),
+    Node.from_file(
+        'HazardClassification', stage_path('HazardClassification', 'HazardClassification.py'),
+        inputs=PRODUCT_FIELDS,
+        outputs=('hazard_classification',)
+    ),
+    Node.from_file(
+        'CustomerPricingLogic', stage_path('CustomerPricingLogic', 'CustomerPricingLogic.py'),
+        inputs=('product_price', 'product_quantity', 'customer_prime_member', 'customer_delivery_address'),
+        outputs=('final_price', 'delivery_type', 'discount_applied')
+    ),
+    Node.from_file(
+        'CarrierPricing', stage_path('CarrierPricing', 'CarrierPricing.py'),
+        inputs=('product_dimensions', 'product_weight', 'measurements', 'warehouse_pickup_address',
+                'customer_delivery_address', 'customer_prime_member', 'hazard_classification'),
+        outputs=('carrier_pricing',),
+        speculate={'hazard_classification': predict_hazard_classification}
+    ),
+    Node.from_file(
+        'NegotiationWithCarrier', stage_path('NegotiationWithCarrier', 'NegotiationWithCarrier.py'),
+        inputs=('carrier_pricing', 'customer_prime_member', 'hazard_classification', 'product_quantity'),
+        outputs=('negotiated_prices', 'chat', 'recommendation')
+    ),
+    Node.from_file(
+        'NeptuneIntegration', stage_path(NEPTUNE_DIR, 'NeptuneIntegration.py'),
+        inputs=('order_id', 'carrier_pricing', 'negotiated_prices', 'hazard_classification',
+                'customer_prime_member'),
+        outputs=('option_type_neptune', 'recommendation_neptune'),
+        attribute='handler'
+    ),
+    Node.from_file(
+        'GenerateArtifact', stage_path('GenerateArtifact', 'GenerateArtifact.py'),
+        inputs=('order_id', 'customer_delivery_address', 'product_price', 'warehouse_pickup_address',
+                'hazard_classification', 'carrier_pricing', 'negotiated_prices', 'chat',
+                'recommendation', 'final_price') + PRODUCT_FIELDS,
+        outputs=('artifact_url',)
+    ),
+]
+
+order_pipeline = Pipeline(
+    ORDER_NODES,
+    max_workers=int(os.environ.get('PIPELINE_MAX_WORKERS', 4)),
+    speculate=os.environ.get('PIPELINE_SPECULATE', 'true').lower() == 'true'
+)
+
+
+def main(argv):
+    """Usage: OrderPipeline.py run <event.json | orders.jsonl> | OrderPipeline.py asl"""
+    if len(argv) >= 1 and argv[0] == 'asl':
+        print(order_pipeline.state_machine_json())
+        return
+    if len(argv) != 2 or argv[0] != 'run':
+        print(main.__doc__)
+        return
+    with open(argv[1]) as f:
+        if argv[1].endswith('.jsonl'):
+            results = order_pipeline.run_batch([json.loads(line) for line in f if line.strip()])
+        else:
+            results = order_pipeline.run(json.load(f))
+    print(json.dumps(results, indent=2, default=str))
+    print(f"Speculation: {json.dumps(order_pipeline.speculation_stats)}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
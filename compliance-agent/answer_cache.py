@@ -0,0 +1,95 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from exportedge_common.cache import build_cache, fingerprint
+from regulations_index import tokenize
+
+# Warm-container LRU backed by an optional shared DynamoDB table
+answer_cache = build_cache(
+    'compliance-answer',
+    ttl_seconds=int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 24 * 3600)),
+    table_name=os.environ.get('ANSWER_CACHE_TABLE'),
+    max_entries=int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 512))
+)
+
+# Jaccard similarity over question token sets needed for a near-duplicate hit.
+# Off by default: questions that differ in one word can need different answers.
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_SIMILARITY', 0))
+MAX_RECENT_QUESTIONS = 512
+
+# Even above the threshold, a near-duplicate must name the same countries and
+# numbers (HS codes, quantities): 'HS 8507 to USA' is not 'HS 8506 to UK'
+COUNTRY_TOKENS = frozenset({'usa', 'uk', 'australia', 'india'})
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+# Token sets of recently answered questions in this container, for near-duplicate matching
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def normalize_question(text):
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', text.casefold())).strip()
+
+
+def question_key(user_input, language):
+    return fingerprint({'question': normalize_question(user_input), 'language': language})
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def key_tokens(tokens):
+    """Country and numeric tokens, which a near-duplicate must match exactly."""
+    return frozenset(token for token in tokens if token in COUNTRY_TOKENS or token.isdigit())
+
+
+def _nearest(language, tokens):
+    best_key, best_score = None, 0.0
+    required = key_tokens(tokens)
+    with _recent_lock:
+        candidates = list(_recent.items())
+    for key, (candidate_language, candidate_tokens) in candidates:
+        if candidate_language != language or key_tokens(candidate_tokens) != required:
+            continue
+        score = similarity(tokens, candidate_tokens)
+        if score > best_score:
+            best_key, best_score = key, score
+    return best_key, best_score
+
+
+def lookup(user_input, language):
+    """Return ``(answer, metadata)``; ``answer`` is None on a miss."""
+    started = time.perf_counter()
+    key = question_key(user_input, language)
+    entry, tier = answer_cache.lookup(key)
+    metadata = {"hit": entry is not None, "tier": tier, "match": "exact" if entry else None}
+
+    if entry is None and NEAR_DUPLICATE_THRESHOLD > 0:
+        near_key, score = _nearest(language, frozenset(tokenize(user_input)))
+        if near_key and score >= NEAR_DUPLICATE_THRESHOLD:
+            entry, tier = answer_cache.lookup(near_key)
+            if entry is not None:
+                metadata = {"hit": True, "tier": tier, "match": "near", "similarity": round(score, 3)}
+
+    metadata["lookup_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return (entry.value if entry else None), metadata
+
+
+def store(user_input, language, answer):
+    if not answer:
+        return
+    key = question_key(user_input, language)
+    answer_cache.put(key, answer)
+    with _recent_lock:
+        _recent[key] = (language, frozenset(tokenize(user_input)))
+        _recent.move_to_end(key)
+        while len(_recent) > MAX_RECENT_QUESTIONS:
+            _recent.popitem(last=False)
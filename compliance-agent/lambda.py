@@ -1,102 +1,102 @@
-import boto3
 import json
-import time
-from botocore.exceptions import ClientError
- 
-# Initialize Bedrock client
-client = boto3.client('bedrock-runtime')
-def invoke_with_retries(payload, model_id, max_retries=3):
-    attempt = 0
-    while attempt <= max_retries:
-        try:
-            # Invoke Bedrock model
-            response = client.invoke_model(
-                modelId=model_id,
-                body=json.dumps(payload),
-                contentType='application/json',
-                accept='application/json'
-            )
-            return response
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'ThrottlingException':
-                wait_time = min(2 ** attempt, 5)  # Exponential backoff capped at 5 seconds
-                print(f"ThrottlingException: Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-                attempt += 1
-            else:
-                raise e
-        except Exception as e:
-            print(f"Error: {e}")
-        time.sleep(1)  # 1-second delay between attempts
- 
-    raise Exception("Max retries exceeded due to ThrottlingException or connection issues.")
- 
- 
-def lambda_handler(event, context):
-    try:
-        # Log the raw event for debugging
-        print("Raw Event Received:", json.dumps(event))
- 
-        # Parse the request body
-        if "body" in event:
-            try:
-                body = json.loads(event["body"])
-            except json.JSONDecodeError:
-                raise ValueError("Invalid JSON format in the request body.")
-        else:
-            body = event
- 
-        # Extract user input, language, and retry state
-        user_input = body.get('user_input', '').strip()
-        user_language = body.get('language', 'en').strip()
-        is_retrying = body.get('is_retrying', False)
- 
-        if not user_input:
-            raise ValueError("Input message is empty.")
- 
-        # Enhanced Prompt with Markdown
-        prompt = f"""
+import os
+
+import answer_cache
+from exportedge_common.bedrock import build_cached_payload, invoke_model, response_text
+from exportedge_common.streaming import serve, sse_event, sse_response, stream_completion, wants_stream
+from exportedge_common.telemetry import instrument_stage
+from regulations_index import format_passages, get_index
+
+CHAT_MODEL_ID = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+
+# Grounded answers can be shorter; fall back to the full budget without passages
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 4))
+GROUNDED_MAX_TOKENS = int(os.environ.get('GROUNDED_MAX_TOKENS', 600))
+UNGROUNDED_MAX_TOKENS = 1000
+
+# Static compliance instructions, sent as the system prompt on every call
+SYSTEM_PROMPT = """
 You are a compliance officer assisting Indian exporters with documentation for shipments to the USA, Australia, and the UK.
- 
+
 When responding to queries:
 - Provide concise, pointwise answers.
 - Use Markdown formatting for clarity. For example:
   - Use `**bold**` for headers or key points.
   - Use clickable links like `[link text](https://example.com)`.
 - Separate mandatory and optional documents if applicable.
- 
-Now respond to the user's query in Markdown format. Example:
+- When reference passages are provided, base your answer on them and link their sources.
+
+Respond to the user's query in Markdown format. Example:
 - **Document Name**: Brief description.
   - Link: [Click here for details](https://example.com)
- 
-Now respond to the user's query: {user_input}
-        """
- 
-        # Prepare the payload for the Bedrock model
-        payload = {
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000,  # Limit response length for speed
-            "anthropic_version": "bedrock-2023-05-31"  # Adjust Bedrock version
-        }
- 
-        # Invoke the Bedrock model with retries
-        response = invoke_with_retries(payload, model_id='anthropic.claude-3-5-sonnet-20240620-v1:0')
- 
-        # Parse the response body
-        response_body = response['body'].read().decode('utf-8')
-        print("Decoded Bedrock Response Body:", response_body)
- 
-        model_output = json.loads(response_body)
- 
-        # Extract content from the response
-        if 'content' not in model_output or not model_output['content']:
-            raise ValueError(f"'content' key not found in the Bedrock response or it is empty: {model_output}")
- 
-        # Extract and return the assistant's response
-        assistant_response = model_output['content'][0].get('text', '').strip()
-        if not assistant_response:
-            raise ValueError("AI response content is empty.")
- 
+"""
+
+
+def parse_body(event):
+    """Return the JSON request body of an API Gateway event, or the event itself."""
+    if "body" in event:
+        try:
+            return json.loads(event["body"])
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON format in the request body.")
+    return event
+
+
+def build_payload(body):
+    """Build the Bedrock payload for a compliance question."""
+    # Extract user input and language
+    user_input = body.get('user_input', '').strip()
+    user_language = body.get('language', 'en').strip()
+
+    if not user_input:
+        raise ValueError("Input message is empty.")
+
+    # Ground the answer in the top-k passages from the local regulations index
+    try:
+        passages = format_passages(get_index().search(user_input, k=RETRIEVAL_TOP_K))
+    except Exception as e:
+        print(f"Regulations index unavailable: {e}")
+        passages = ""
+
+    # Per-request query; the static Markdown guidance lives in the cached SYSTEM_PROMPT
+    if passages:
+        prompt = f"Reference passages:\n{passages}\n\nNow respond to the user's query: {user_input}"
+        max_tokens = GROUNDED_MAX_TOKENS
+    else:
+        prompt = f"Now respond to the user's query: {user_input}"
+        max_tokens = UNGROUNDED_MAX_TOKENS
+
+    # Prepare the payload for the Bedrock model
+    return build_cached_payload(SYSTEM_PROMPT, prompt, max_tokens=max_tokens, model_id=CHAT_MODEL_ID)  # Limit response length for speed
+
+
+@instrument_stage('ComplianceAgent', attach=False)
+def lambda_handler(event, context):
+    is_retrying = False
+    try:
+        # Log the raw event for debugging
+        print("Raw Event Received:", json.dumps(event))
+
+        body = parse_body(event)
+        is_retrying = body.get('is_retrying', False)
+        user_input = body.get('user_input', '').strip()
+        user_language = body.get('language', 'en').strip()
+
+        # Repeat (or near-duplicate) questions are answered from the cache, before any retrieval
+        assistant_response, cache_metadata = answer_cache.lookup(user_input, user_language)
+        if assistant_response is None:
+            payload = build_payload(body)
+
+            # Invoke the Bedrock model (shared client with retries and rate limiting)
+            model_output = invoke_model(payload, model_id=CHAT_MODEL_ID)
+            print("Decoded Bedrock Response Body:", json.dumps(model_output))
+
+            # Extract and return the assistant's response
+            assistant_response = response_text(model_output)
+            if not assistant_response:
+                raise ValueError("AI response content is empty.")
+            answer_cache.store(user_input, user_language, assistant_response)
+
         # Construct and return the API response
         return {
             "statusCode": 200,
@@ -108,10 +108,11 @@ Now respond to the user's query: {user_input}
             },
             "body": json.dumps({
                 "response": assistant_response,
-                "is_retrying": is_retrying  # Inform the UI of retry state
+                "is_retrying": is_retrying,  # Inform the UI of retry state
+                "cache": cache_metadata
             })
         }
- 
+
     except Exception as e:
         # Log the error for debugging
         print(f"Error: {e}")
@@ -128,3 +129,51 @@ Now respond to the user's query: {user_input}
                 "retry_allowed": not is_retrying  # Prevent multiple retries in the UI
             })
         }
+
+
+def stream_handler(event, context):
+    """Response-streaming entry point, served over HTTP by ``serve`` (see ``run.sh``).
+
+    Clients that asked for ``text/event-stream`` get SSE frames as tokens
+    arrive, with ``STREAM_HEADERS``; everyone else gets the full
+    ``lambda_handler`` response (status code, headers and JSON body).
+    """
+    try:
+        body = parse_body(event)
+    except ValueError:
+        return lambda_handler(event, context)
+    if not wants_stream(event, body):
+        return lambda_handler(event, context)
+    return sse_response(stream_answer(body))
+
+
+def stream_answer(body):
+    """Yield SSE frames for a compliance question, from the answer cache when possible."""
+    is_retrying = body.get('is_retrying', False)
+    try:
+        user_input = body.get('user_input', '').strip()
+        user_language = body.get('language', 'en').strip()
+        cached_answer, cache_metadata = answer_cache.lookup(user_input, user_language)
+        if cached_answer is None:
+            payload = build_payload(body)
+    except Exception as e:
+        print(f"Error: {e}")
+        yield sse_event({"error": str(e), "retry_allowed": not is_retrying}, event='error')
+        return
+
+    if cached_answer is not None:
+        yield sse_event({"text": cached_answer}, event='delta')
+        yield sse_event({"is_retrying": is_retrying, "cache": cache_metadata}, event='done')
+        return
+
+    yield from stream_completion(
+        payload,
+        model_id=CHAT_MODEL_ID,
+        stage='ComplianceAgent',
+        metadata={"is_retrying": is_retrying, "cache": cache_metadata},
+        on_complete=lambda answer: answer_cache.store(user_input, user_language, answer)
+    )
+
+
+if __name__ == '__main__':
+    serve(stream_handler)
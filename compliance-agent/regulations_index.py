@@ -0,0 +1,185 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, 'corpus', 'export_regulations.jsonl')
+INDEX_PATH = os.environ.get('REGULATIONS_INDEX_PATH', os.path.join(HERE, 'export_regulations.idx'))
+
+# Index file layout (little endian):
+#   header    magic, version, doc count, term count, avgdl, k1, b, meta length
+#   meta      UTF-8 JSON {"terms": [[term, df, offset], ...], "passages": [...]}
+#   padding   to a 4-byte boundary
+#   doc_len   uint32 per document
+#   postings  uint32 (doc id, term frequency) pairs, grouped by term
+MAGIC = b'EXRI'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIfffI')
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset(
+    'a an and are as at be by can do does for from how i in is it my of on or '
+    'the to what when which with need needed required documents document shipping ship'.split()
+)
+# Map destination spellings onto the country tokens used in the corpus
+SYNONYMS = {
+    'us': 'usa', 'america': 'usa', 'states': 'usa', 'united': '',
+    'britain': 'uk', 'england': 'uk', 'kingdom': 'uk', 'gb': 'uk',
+    'aus': 'australia', 'australian': 'australia',
+    'batteries': 'battery', 'electronic': 'electronics',
+}
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        token = SYNONYMS.get(token, token)
+        if not token or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_index(corpus_path=CORPUS_PATH, index_path=INDEX_PATH):
+    """Build the BM25 index file from the curated corpus."""
+    passages = load_corpus(corpus_path)
+    doc_terms = [
+        Counter(tokenize(f"{p['country']} {p['title']} {p['title']} {p['text']}"))
+        for p in passages
+    ]
+    postings = {}
+    for doc_id, terms in enumerate(doc_terms):
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    doc_lengths = [sum(terms.values()) for terms in doc_terms]
+    avgdl = sum(doc_lengths) / max(len(doc_lengths), 1)
+
+    terms = []
+    offset = 0
+    for term in sorted(postings):
+        terms.append([term, len(postings[term]), offset])
+        offset += len(postings[term])
+
+    meta = json.dumps({"terms": terms, "passages": passages}, ensure_ascii=False).encode('utf-8')
+    padding = b'\0' * (-(HEADER.size + len(meta)) % 4)
+    with open(index_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(passages), len(terms), avgdl, K1, B, len(meta)))
+        f.write(meta)
+        f.write(padding)
+        f.write(struct.pack(f'<{len(doc_lengths)}I', *doc_lengths))
+        for term, _, _ in terms:
+            for doc_id, tf in postings[term]:
+                f.write(struct.pack('<II', doc_id, tf))
+    return index_path
+
+
+class RegulationsIndex:
+    """Memory-mapped BM25 index over the export regulations corpus."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n_docs, n_terms, self.avgdl, self.k1, self.b, meta_len = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported regulations index file: {path}")
+        meta = json.loads(self.buffer[HEADER.size:HEADER.size + meta_len].decode('utf-8'))
+        self.passages = meta['passages']
+        self.terms = {term: (df, offset) for term, df, offset in meta['terms']}
+
+        start = HEADER.size + meta_len
+        start += -start % 4
+        # Decoded explicitly as little endian, whatever the host byte order
+        n_words = (len(self.buffer) - start) // 4
+        words = struct.unpack_from(f'<{n_words}I', self.buffer, start)
+        self.doc_lengths = words[:self.n_docs]
+        self.postings = words[self.n_docs:]
+
+    def search(self, query, k=4):
+        """Return the top-``k`` passages for ``query`` as ``(score, passage)`` pairs."""
+        scores = {}
+        for term in set(tokenize(query)):
+            if term not in self.terms:
+                continue
+            df, offset = self.terms[term]
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            for i in range(offset, offset + df):
+                doc_id = self.postings[2 * i]
+                tf = self.postings[2 * i + 1]
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(round(score, 3), self.passages[doc_id]) for doc_id, score in best]
+
+
+_index = None
+
+
+def get_index():
+    """Load the index once per container, building it into /tmp if it was not packaged."""
+    global _index
+    if _index is None:
+        path = INDEX_PATH
+        if not os.path.exists(path):
+            path = build_index(index_path=os.path.join(tempfile.gettempdir(), os.path.basename(INDEX_PATH)))
+        _index = RegulationsIndex(path)
+    return _index
+
+
+def format_passages(results):
+    """Render search results as numbered reference passages for the prompt."""
+    return "\n".join(
+        f"[{i}] {p['title']} ({p['country']}): {p['text']} Source: {p['source']}"
+        for i, (_, p) in enumerate(results, 1)
+    )
+
+
+def benchmark(queries=None, repeat=200):
+    """Print mean and p99 query latency in microseconds."""
+    index = get_index()
+    queries = queries or [
+        "documents for shipping electronics to the UK",
+        "lithium battery phone export to USA by air",
+        "certificate of origin Australia ECTA duty",
+        "what is ISF 10+2",
+        "GST refund export shipping bill",
+    ]
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query)
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    print(f"{len(timings)} queries over {index.n_docs} passages: "
+          f"mean {sum(timings) / len(timings):.1f}us, p99 {timings[int(len(timings) * 0.99) - 1]:.1f}us")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'build':
+        print(f"Index written to {build_index()}")
+    elif command == 'query':
+        for score, passage in get_index().search(' '.join(sys.argv[2:])):
+            print(f"{score:7.3f}  {passage['id']}: {passage['title']}")
+    elif command == 'bench':
+        benchmark()
+    else:
+        print("Usage: regulations_index.py [build | query <text> | bench]")
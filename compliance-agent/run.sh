@@ -0,0 +1,4 @@
+#!/bin/sh
+# Lambda Web Adapter entry point (handler: run.sh, AWS_LAMBDA_EXEC_WRAPPER=/opt/bootstrap,
+# AWS_LWA_INVOKE_MODE=response_stream); the adapter proxies Function URL requests to this server
+exec python lambda.py
@@ -0,0 +1,5 @@
+"""Shared helpers for the ExportEdge Lambda functions.
+
+Deployed as a Lambda layer (zipped under ``python/exportedge_common``) so every
+order-pipeline stage and chat agent can import it.
+"""
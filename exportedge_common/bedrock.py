@@ -0,0 +1,577 @@
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError, ConnectTimeoutError, ReadTimeoutError
+
+from exportedge_common.telemetry import current_stage_name, record_llm_call, record_metrics, submit_in_stage
+
+DEFAULT_MODEL_ID = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+ANTHROPIC_VERSION = 'bedrock-2023-05-31'
+
+# Tuned for warm Lambda containers: keep sockets alive between invocations,
+# allow a handful of concurrent calls per container and fail fast on connect.
+# Retries are disabled here because invoke_model() below owns the retry loop.
+BEDROCK_CONFIG = Config(
+    connect_timeout=int(os.environ.get('BEDROCK_CONNECT_TIMEOUT', 5)),
+    read_timeout=int(os.environ.get('BEDROCK_READ_TIMEOUT', 120)),
+    max_pool_connections=int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', 20)),
+    tcp_keepalive=True,
+    retries={'max_attempts': 0, 'mode': 'standard'},
+)
+
+MAX_RETRIES = int(os.environ.get('BEDROCK_MAX_RETRIES', 4))
+BACKOFF_BASE = float(os.environ.get('BEDROCK_BACKOFF_BASE', 0.5))
+BACKOFF_CAP = float(os.environ.get('BEDROCK_BACKOFF_CAP', 8.0))
+
+# Errors worth retrying: throttling, transient service faults and timeouts.
+# Anything else (ValidationException, AccessDeniedException, ...) fails at once.
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | {
+    'ServiceUnavailableException',
+    'InternalServerException',
+    'ModelNotReadyException',
+    'ModelTimeoutException',
+}
+
+# One client per region (None is the function's own region)
+_clients = {}
+_client_lock = threading.Lock()
+
+# Container-wide prompt-cache accounting (see record_prompt_cache)
+prompt_cache_stats = {'calls': 0, 'hits': 0, 'writes': 0, 'read_tokens': 0, 'write_tokens': 0}
+_stats_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Per-container rate limiter with additive-increase/multiplicative-decrease.
+
+    ``rate`` tokens are added per second up to ``capacity``. A throttling
+    response halves the refill rate (down to ``min_rate``); every success
+    nudges it back towards the configured rate.
+    """
+
+    def __init__(self, rate, capacity, min_rate=0.2):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = float(min_rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; return False if ``timeout`` expires first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+    def on_throttle(self):
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+rate_limiter = TokenBucket(
+    rate=float(os.environ.get('BEDROCK_RATE_PER_SECOND', 5)),
+    capacity=float(os.environ.get('BEDROCK_BURST', 10)),
+)
+
+
+def get_client(region=None):
+    """Return the container-wide bedrock-runtime client for ``region``, creating it on first use."""
+    client = _clients.get(region)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(region)
+            if client is None:
+                client = boto3.client('bedrock-runtime', region_name=region, config=BEDROCK_CONFIG)
+                _clients[region] = client
+    return client
+
+
+def set_client(client, region=None):
+    """Install a client for ``region``, e.g. a ``FakeBedrockClient`` in local tests."""
+    with _client_lock:
+        _clients[region] = client
+
+
+def is_retryable(error):
+    """Return (retryable, throttled) for an exception raised by invoke_model."""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        return code in RETRYABLE_ERROR_CODES, code in THROTTLING_ERROR_CODES
+    if isinstance(error, (ConnectionError, ConnectTimeoutError, ReadTimeoutError)):
+        return True, False
+    return False, False
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given (zero-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+# Models that accept prompt-caching checkpoints, with the minimum prefix length
+# (tokens) for one to take effect. Other models reject ``cache_control``.
+PROMPT_CACHE_MIN_TOKENS = {
+    'anthropic.claude-3-5-haiku-20241022-v1:0': 2048,
+    'anthropic.claude-3-5-sonnet-20241022-v2:0': 1024,
+    'anthropic.claude-3-7-sonnet-20250219-v1:0': 1024,
+    'anthropic.claude-sonnet-4-20250514-v1:0': 1024,
+    'anthropic.claude-opus-4-20250514-v1:0': 1024,
+}
+CHARS_PER_TOKEN = 4
+
+
+def prompt_cache_min_tokens(model_id):
+    """Minimum cacheable prefix for ``model_id`` (also as a ``us.``/``eu.`` profile), or None."""
+    for base_id, min_tokens in PROMPT_CACHE_MIN_TOKENS.items():
+        if model_id == base_id or model_id.endswith('.' + base_id):
+            return min_tokens
+    return None
+
+
+def build_cached_payload(system_prefix, user_content, max_tokens, model_id=DEFAULT_MODEL_ID):
+    """Build a Messages API payload with the static instructions as a system prefix.
+
+    The prefix is marked with ``cache_control`` so Bedrock can reuse it across
+    requests, but only when ``model_id`` supports prompt caching and the
+    prefix (estimated at ``CHARS_PER_TOKEN``) reaches its minimum length;
+    otherwise it is sent as a plain system prompt.
+    """
+    block = {"type": "text", "text": system_prefix}
+    min_tokens = prompt_cache_min_tokens(model_id)
+    if min_tokens is not None and len(system_prefix) / CHARS_PER_TOKEN >= min_tokens:
+        block["cache_control"] = {"type": "ephemeral"}
+    return build_payload(user_content, max_tokens, system=[block])
+
+
+def payload_for_model(payload, model_id):
+    """``payload`` without ``cache_control`` markers if ``model_id`` does not support prompt caching."""
+    if prompt_cache_min_tokens(model_id) is not None or not isinstance(payload.get("system"), list):
+        return payload
+    system = [{k: v for k, v in block.items() if k != "cache_control"} for block in payload["system"]]
+    return {**payload, "system": system}
+
+
+def build_payload(prompt, max_tokens, system=None):
+    """Build a Messages API payload with a single user turn."""
+    payload = {
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "anthropic_version": ANTHROPIC_VERSION
+    }
+    if system:
+        payload["system"] = system
+    return payload
+
+
+def invoke_model(payload, model_id=DEFAULT_MODEL_ID, max_retries=MAX_RETRIES, stage=None, region=None):
+    """Invoke a Bedrock model and return the decoded JSON response body.
+
+    Calls are admitted through the container's token bucket and retried with
+    jittered backoff on throttling, transient service errors and timeouts.
+    The last error is re-raised once retries are exhausted. Every call emits
+    one telemetry record attributed to ``stage`` (default: the current stage).
+    """
+    body = json.dumps(payload)
+    attempt = 0
+    throttles = 0
+    started = time.perf_counter()
+    while True:
+        rate_limiter.acquire()
+        try:
+            response = get_client(region).invoke_model(
+                modelId=model_id,
+                body=body,
+                contentType='application/json',
+                accept='application/json'
+            )
+            model_output = json.loads(response['body'].read().decode('utf-8'))
+        except Exception as e:
+            retryable, throttled = is_retryable(e)
+            if throttled:
+                throttles += 1
+                rate_limiter.on_throttle()
+            if not retryable or attempt >= max_retries:
+                record_llm_call(model_id, (time.perf_counter() - started) * 1000, retries=attempt,
+                                throttles=throttles, error=e, stage=stage)
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Bedrock call failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        rate_limiter.on_success()
+        record_prompt_cache(model_output, model_id)
+        record_llm_call(model_id, (time.perf_counter() - started) * 1000, usage=model_output.get('usage'),
+                        retries=attempt, throttles=throttles, stage=stage)
+        return model_output
+
+
+def invoke_model_stream(payload, model_id=DEFAULT_MODEL_ID, max_retries=MAX_RETRIES, stage=None, region=None):
+    """Invoke a Bedrock model with response streaming and yield text deltas as they arrive.
+
+    Retries only cover opening the stream; once the first event has been
+    received, errors propagate to the caller because text was already emitted.
+    The telemetry record is emitted when the stream ends or is closed early.
+    """
+    body = json.dumps(payload)
+    attempt = 0
+    throttles = 0
+    started = time.perf_counter()
+    while True:
+        rate_limiter.acquire()
+        try:
+            response = get_client(region).invoke_model_with_response_stream(
+                modelId=model_id,
+                body=body,
+                contentType='application/json',
+                accept='application/json'
+            )
+            break
+        except Exception as e:
+            retryable, throttled = is_retryable(e)
+            if throttled:
+                throttles += 1
+                rate_limiter.on_throttle()
+            if not retryable or attempt >= max_retries:
+                record_llm_call(model_id, (time.perf_counter() - started) * 1000, retries=attempt,
+                                throttles=throttles, error=e, stage=stage, streamed=True)
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Bedrock stream failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+    rate_limiter.on_success()
+
+    stream = response['body']
+    usage = {}
+    error = None
+    try:
+        for stream_event in stream:
+            chunk = stream_event.get('chunk')
+            if not chunk:
+                continue
+            message = json.loads(chunk['bytes'].decode('utf-8'))
+            if message.get('type') == 'message_start':
+                record_prompt_cache(message.get('message', {}), model_id)
+                usage.update(message.get('message', {}).get('usage') or {})
+            elif message.get('type') == 'message_delta':
+                # Output tokens are reported once, on the final message delta
+                usage.update(message.get('usage') or {})
+            elif message.get('type') == 'content_block_delta':
+                text = message.get('delta', {}).get('text')
+                if text:
+                    yield text
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Release the connection when the caller stops reading early
+        if hasattr(stream, 'close'):
+            stream.close()
+        record_llm_call(model_id, (time.perf_counter() - started) * 1000, usage=usage, retries=attempt,
+                        throttles=throttles, error=error, stage=stage, streamed=True)
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies (seconds) per model."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, q, min_samples=20):
+        """The ``q`` quantile of recent latencies, or None until ``min_samples`` are seen."""
+        with self.lock:
+            samples = sorted(self.samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class HedgePolicy:
+    """When and where to send a second copy of a slow Bedrock request.
+
+    The hedge fires once the primary has run past the ``percentile`` of recent
+    latencies for its model (clamped to ``[min_delay, max_delay]``;
+    ``default_delay`` until enough samples exist). It goes to ``region`` and/or
+    ``model_id`` (e.g. a cross-region inference profile) when set. Hedges are
+    capped at ``budget`` extra requests per primary request, with a small burst.
+    """
+
+    def __init__(self, enabled=False, percentile=0.95, min_delay=1.0, max_delay=30.0, default_delay=8.0,
+                 budget=0.1, burst=2.0, region=None, model_id=None):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.budget = budget
+        self.burst = burst
+        self.region = region
+        self.model_id = model_id
+        self.latencies = LatencyTracker()
+        self.tokens = burst
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'over_budget': 0}
+        self.lock = threading.Lock()
+
+    def deadline(self, model_id):
+        observed = self.latencies.percentile(model_id, self.percentile)
+        if observed is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def admit_request(self):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.tokens = min(self.burst, self.tokens + self.budget)
+
+    def try_hedge(self):
+        """Spend one hedge from the budget; False when the budget is exhausted."""
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.stats['hedged'] += 1
+                return True
+            self.stats['over_budget'] += 1
+            return False
+
+    def record_outcome(self, model_id, seconds, hedge_won, stage=None):
+        self.latencies.record(model_id, seconds)
+        with self.lock:
+            self.stats['hedge_wins'] += int(hedge_won)
+        record_metrics({'Stage': stage or 'Unknown'}, [('HedgeWon', 'Count')], {'HedgeWon': int(hedge_won)})
+
+
+hedge_policy = HedgePolicy(
+    enabled=os.environ.get('BEDROCK_HEDGE', 'false').lower() == 'true',
+    percentile=float(os.environ.get('BEDROCK_HEDGE_PERCENTILE', 0.95)),
+    min_delay=float(os.environ.get('BEDROCK_HEDGE_MIN_DELAY', 1.0)),
+    max_delay=float(os.environ.get('BEDROCK_HEDGE_MAX_DELAY', 30.0)),
+    default_delay=float(os.environ.get('BEDROCK_HEDGE_DEFAULT_DELAY', 8.0)),
+    budget=float(os.environ.get('BEDROCK_HEDGE_BUDGET', 0.1)),
+    region=os.environ.get('BEDROCK_HEDGE_REGION'),
+    model_id=os.environ.get('BEDROCK_HEDGE_MODEL_ID'),
+)
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get('BEDROCK_HEDGE_WORKERS', 16)), thread_name_prefix='bedrock-hedge'
+                )
+    return _hedge_executor
+
+
+def _race(start, model_id, stage, policy):
+    """Run ``start(hedge)`` and, past the deadline, a hedged copy; return ``(winner_future, hedge_won, loser)``.
+
+    ``start`` is called with False for the primary and True for the hedge and
+    must return the (blocking) result. The first successful future wins; if
+    one copy fails the other is awaited, and if both fail the primary's error
+    is raised.
+    """
+    policy.admit_request()
+    started = time.perf_counter()
+    primary = submit_in_stage(_executor(), start, False)
+    finished, _ = wait([primary], timeout=policy.deadline(model_id))
+    if finished or not policy.try_hedge():
+        primary.result()
+        policy.record_outcome(model_id, time.perf_counter() - started, False, stage)
+        return primary, False, None
+
+    print(f"Bedrock call to {model_id} exceeded its hedge deadline; sending a hedged request")
+    record_metrics({'Stage': stage or 'Unknown'}, [('HedgeFired', 'Count')], {'HedgeFired': 1})
+    hedge = submit_in_stage(_executor(), start, True)
+    pending = {primary, hedge}
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            if future.exception() is None:
+                loser = (pending or {None}).pop()
+                policy.record_outcome(model_id, time.perf_counter() - started, future is hedge, stage)
+                return future, future is hedge, loser
+    raise primary.exception()
+
+
+def invoke_model_hedged(payload, model_id=DEFAULT_MODEL_ID, stage=None, policy=None):
+    """``invoke_model`` with request hedging under ``policy`` (default: the env-configured one).
+
+    The losing request cannot be aborted once sent; its result is discarded.
+    """
+    policy = policy or hedge_policy
+    if not policy.enabled:
+        return invoke_model(payload, model_id=model_id, stage=stage)
+
+    def start(hedged):
+        if hedged:
+            hedge_model_id = policy.model_id or model_id
+            return invoke_model(payload_for_model(payload, hedge_model_id), model_id=hedge_model_id, stage=stage,
+                                region=policy.region)
+        return invoke_model(payload, model_id=model_id, stage=stage)
+
+    winner, _, _ = _race(start, model_id, stage, policy)
+    return winner.result()
+
+
+def invoke_model_stream_hedged(payload, model_id=DEFAULT_MODEL_ID, stage=None, policy=None):
+    """``invoke_model_stream`` hedged on time to first token.
+
+    Both streams race for their first text delta; the winner's stream is
+    yielded in full and the loser's stream is closed, releasing its connection.
+    """
+    policy = policy or hedge_policy
+    if not policy.enabled:
+        yield from invoke_model_stream(payload, model_id=model_id, stage=stage)
+        return
+
+    streams = {}
+
+    def start(hedged):
+        if hedged:
+            hedge_model_id = policy.model_id or model_id
+            stream = invoke_model_stream(payload_for_model(payload, hedge_model_id), model_id=hedge_model_id,
+                                         stage=stage, region=policy.region)
+        else:
+            stream = invoke_model_stream(payload, model_id=model_id, stage=stage)
+        streams[hedged] = stream
+        return next(stream, None)
+
+    winner, hedge_won, loser = _race(start, model_id, stage, policy)
+    if loser is not None:
+        # Close the losing stream once its first read returns (a generator cannot be closed mid-read)
+        loser.add_done_callback(lambda _: streams.get(not hedge_won) and streams[not hedge_won].close())
+    first = winner.result()
+    if first is None:
+        return
+    yield first
+    yield from streams[hedge_won]
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls in this container into one in-flight call.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for its result. Every caller gets its own deep copy, so one
+    order mutating the response cannot affect another. Nothing is kept once
+    the call completes, so this is not a cache.
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        """Return ``(result, shared)``; ``shared`` is True when another caller's call was joined."""
+        with self.lock:
+            self.stats['calls'] += 1
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+        return copy.deepcopy(future.result()), not leader
+
+
+model_flights = SingleFlight()
+
+
+def request_key(payload, model_id):
+    """SHA-256 of the model ID and the canonical JSON payload."""
+    canonical = json.dumps([model_id, payload], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def invoke_model_coalesced(payload, model_id=DEFAULT_MODEL_ID, stage=None, flights=None):
+    """``invoke_model`` where concurrent byte-identical requests share one Bedrock call."""
+    flights = flights or model_flights
+    model_output, shared = flights.do(request_key(payload, model_id),
+                                      lambda: invoke_model(payload, model_id=model_id, stage=stage))
+    if shared:
+        print(f"Shared an identical in-flight request to {model_id}")
+    record_metrics({'Stage': stage or current_stage_name()}, [('CoalescedCalls', 'Count')],
+                   {'CoalescedCalls': int(shared)})
+    return model_output
+
+
+def record_prompt_cache(model_output, model_id):
+    """Account one call's prompt-cache usage and return its per-call summary."""
+    usage = model_output.get('usage') or {}
+    read_tokens = usage.get('cache_read_input_tokens') or 0
+    write_tokens = usage.get('cache_creation_input_tokens') or 0
+    summary = {
+        'hit': read_tokens > 0,
+        'read_tokens': read_tokens,
+        'write_tokens': write_tokens,
+        'input_tokens': usage.get('input_tokens', 0)
+    }
+    with _stats_lock:
+        prompt_cache_stats['calls'] += 1
+        prompt_cache_stats['hits'] += int(read_tokens > 0)
+        prompt_cache_stats['writes'] += int(write_tokens > 0)
+        prompt_cache_stats['read_tokens'] += read_tokens
+        prompt_cache_stats['write_tokens'] += write_tokens
+    if read_tokens or write_tokens:
+        print(f"Prompt cache {'hit' if summary['hit'] else 'miss'} for {model_id}: {json.dumps(summary)}")
+    return summary
+
+
+def response_text(model_output):
+    """Extract the assistant text from a Messages (or legacy Completions) response."""
+    if 'completion' in model_output:
+        return model_output['completion'].strip()
+    content = model_output.get('content')
+    if not isinstance(content, list) or not content:
+        raise ValueError(f"'content' key not found in the Bedrock response or it is empty: {model_output}")
+    return content[0].get('text', '').strip()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from exportedge_common.telemetry import submit_in_stage
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return _WHITESPACE.sub(' ', value).strip().casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def fingerprint(fields):
+    """Return a stable SHA-256 key for a mapping of fields.
+
+    Strings are case-folded and whitespace-collapsed so cosmetic differences
+    in the same product or question map to the same key.
+    """
+    canonical = json.dumps(_normalize(fields), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    """A cached value; between ``fresh_until`` and ``expires_at`` it is stale but servable."""
+
+    __slots__ = ('value', 'stored_at', 'expires_at', 'fresh_until')
+
+    def __init__(self, value, stored_at, expires_at, fresh_until=None):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.fresh_until = expires_at if fresh_until is None else fresh_until
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+    def expired(self, now=None):
+        return (now or time.time()) >= self.expires_at
+
+    def stale(self, now=None):
+        return (now or time.time()) >= self.fresh_until
+
+
+class MemoryTier:
+    """Warm-container LRU tier; tests can also inject one as a stand-in for the shared tier."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expired():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while self.max_entries and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class DynamoDBTier:
+    """Shared tier backed by a DynamoDB table.
+
+    The table needs a string partition key ``cache_key``; enable DynamoDB TTL on
+    ``expires_at`` so expired items are removed by the service.
+    """
+
+    name = 'dynamodb'
+
+    def __init__(self, table_name, namespace):
+        self.table_name = table_name
+        self.namespace = namespace
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = boto3.resource('dynamodb').Table(self.table_name)
+        return self._table
+
+    def _key(self, key):
+        return f'{self.namespace}#{key}'
+
+    def get(self, key):
+        item = self.table.get_item(Key={'cache_key': self._key(key)}).get('Item')
+        if not item:
+            return None
+        entry = CacheEntry(json.loads(item['value']), float(item['stored_at']), float(item['expires_at']),
+                           float(item.get('fresh_until', item['expires_at'])))
+        return None if entry.expired() else entry
+
+    def put(self, key, entry):
+        self.table.put_item(Item={
+            'cache_key': self._key(key),
+            'value': json.dumps(entry.value),
+            'stored_at': int(entry.stored_at),
+            'expires_at': int(entry.expires_at),
+            'fresh_until': int(entry.fresh_until)
+        })
+
+    def delete(self, key):
+        self.table.delete_item(Key={'cache_key': self._key(key)})
+
+
+class TieredCache:
+    """Read-through cache over an ordered list of tiers (fastest first).
+
+    A hit in a slower tier is copied into the faster tiers. Failures of a tier
+    are logged and treated as a miss so the cache never fails the caller.
+    Entries stay servable for ``stale_seconds`` after their TTL so
+    ``get_or_refresh`` can answer at once while a refresh runs in the background.
+    """
+
+    def __init__(self, tiers, ttl_seconds, stale_seconds=0):
+        self.tiers = tiers
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor = None
+
+    def lookup(self, key):
+        """Return ``(entry, tier_name)`` or ``(None, None)`` on a miss."""
+        for index, tier in enumerate(self.tiers):
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                print(f"Cache tier {tier.name} get failed: {e}")
+                continue
+            if entry is not None:
+                for faster in self.tiers[:index]:
+                    try:
+                        faster.put(key, entry)
+                    except Exception as e:
+                        print(f"Cache tier {faster.name} put failed: {e}")
+                return entry, tier.name
+        return None, None
+
+    def get(self, key, default=None):
+        entry, _ = self.lookup(key)
+        return default if entry is None else entry.value
+
+    def put(self, key, value, ttl_seconds=None):
+        now = time.time()
+        fresh_until = now + (ttl_seconds or self.ttl_seconds)
+        entry = CacheEntry(value, now, fresh_until + self.stale_seconds, fresh_until)
+        for tier in self.tiers:
+            try:
+                tier.put(key, entry)
+            except Exception as e:
+                print(f"Cache tier {tier.name} put failed: {e}")
+
+    def get_or_refresh(self, key, loader):
+        """Return ``(value, status, entry)``; ``status`` is ``'fresh'``, ``'stale'`` or ``'miss'``.
+
+        A miss calls ``loader`` inline and stores its result. A stale hit is
+        returned immediately and ``loader`` runs once in the background to
+        replace it; concurrent stale hits for the same key share that refresh.
+        """
+        entry, _ = self.lookup(key)
+        if entry is None:
+            value = loader()
+            self.put(key, value)
+            return value, 'miss', None
+        if entry.stale():
+            self._refresh(key, loader)
+            return entry.value, 'stale', entry
+        return entry.value, 'fresh', entry
+
+    def _refresh(self, key, loader):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+        def refresh():
+            try:
+                self.put(key, loader())
+            except Exception as e:
+                print(f"Background cache refresh failed for {key}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        submit_in_stage(self._refresh_executor, refresh)
+
+    def invalidate(self, key):
+        for tier in self.tiers:
+            try:
+                tier.delete(key)
+            except Exception as e:
+                print(f"Cache tier {tier.name} delete failed: {e}")
+
+
+def build_cache(namespace, ttl_seconds, table_name=None, max_entries=1024, stale_seconds=0):
+    """Build a memory + DynamoDB cache, or a memory-only cache when no table is configured."""
+    tiers = [MemoryTier(max_entries)]
+    if table_name:
+        tiers.append(DynamoDBTier(table_name, namespace))
+    return TieredCache(tiers, ttl_seconds, stale_seconds)
@@ -0,0 +1,147 @@
+import math
+import re
+
+# Well-to-wheel kg CO₂e per tonne-km by transport mode (freight averages)
+EMISSION_FACTORS = {
+    'Air': 0.602,
+    'Sea': 0.016,
+    'Road': 0.105,
+    'Rail': 0.028,
+}
+
+# Actual routes are longer than the great circle (air corridors, shipping lanes via canals)
+DISTANCE_UPLIFT = {
+    'Air': 1.09,
+    'Sea': 1.35,
+    'Road': 1.20,
+    'Rail': 1.20,
+}
+
+# (latitude, longitude, country) for our warehouse and destination cities
+CITIES = {
+    'Mumbai': (19.0760, 72.8777, 'India'),
+    'Delhi': (28.7041, 77.1025, 'India'),
+    'Bengaluru': (12.9716, 77.5946, 'India'),
+    'Chennai': (13.0827, 80.2707, 'India'),
+    'Kolkata': (22.5726, 88.3639, 'India'),
+    'Hyderabad': (17.3850, 78.4867, 'India'),
+    'Pune': (18.5204, 73.8567, 'India'),
+    'Ahmedabad': (23.0225, 72.5714, 'India'),
+    'New York': (40.7128, -74.0060, 'USA'),
+    'Los Angeles': (34.0522, -118.2437, 'USA'),
+    'Chicago': (41.8781, -87.6298, 'USA'),
+    'Houston': (29.7604, -95.3698, 'USA'),
+    'Dallas': (32.7767, -96.7970, 'USA'),
+    'Austin': (30.2672, -97.7431, 'USA'),
+    'San Francisco': (37.7749, -122.4194, 'USA'),
+    'Seattle': (47.6062, -122.3321, 'USA'),
+    'Miami': (25.7617, -80.1918, 'USA'),
+    'Boston': (42.3601, -71.0589, 'USA'),
+    'Sydney': (-33.8688, 151.2093, 'Australia'),
+    'Melbourne': (-37.8136, 144.9631, 'Australia'),
+    'Brisbane': (-27.4698, 153.0251, 'Australia'),
+    'Perth': (-31.9505, 115.8605, 'Australia'),
+    'Adelaide': (-34.9285, 138.6007, 'Australia'),
+    'London': (51.5074, -0.1278, 'UK'),
+    'Manchester': (53.4808, -2.2426, 'UK'),
+    'Birmingham': (52.4862, -1.8904, 'UK'),
+    'Leeds': (53.8008, -1.5491, 'UK'),
+    'Edinburgh': (55.9533, -3.1883, 'UK'),
+    'Glasgow': (55.8642, -4.2518, 'UK'),
+}
+
+CITY_ALIASES = {'bangalore': 'Bengaluru', 'new delhi': 'Delhi', 'bombay': 'Mumbai', 'madras': 'Chennai',
+                'calcutta': 'Kolkata', 'nyc': 'New York'}
+
+# Gateway city used when an address names the country but none of our cities
+COUNTRY_GATEWAYS = {'India': 'Mumbai', 'USA': 'New York', 'Australia': 'Sydney', 'UK': 'London'}
+
+# Patterns end in (?!\w) rather than \b so abbreviations ending in a dot ('U.S.') match
+COUNTRY_PATTERNS = {
+    'India': re.compile(r'\b(india|bharat)(?!\w)', re.IGNORECASE),
+    'USA': re.compile(r'\b(usa|u\.s\.a\.?|u\.s\.|us|united states( of america)?)(?!\w)', re.IGNORECASE),
+    'Australia': re.compile(r'\b(australia|aus)(?!\w)', re.IGNORECASE),
+    'UK': re.compile(
+        r'\b(uk|u\.k\.|united kingdom|great britain|britain|england|scotland|wales|northern ireland)(?!\w)',
+        re.IGNORECASE
+    ),
+}
+
+_CITY_NAMES = {name.lower(): name for name in CITIES}
+_CITY_NAMES.update(CITY_ALIASES)
+_CITY = re.compile(
+    r'\b(' + '|'.join(re.escape(name) for name in sorted(_CITY_NAMES, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def great_circle_km(origin, destination):
+    """Haversine distance between two ``(latitude, longitude)`` points."""
+    lat1, lon1 = map(math.radians, origin[:2])
+    lat2, lon2 = map(math.radians, destination[:2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# Precomputed city-to-city table; every lane lookup is a dict read
+DISTANCE_KM = {
+    (a, b): great_circle_km(CITIES[a], CITIES[b])
+    for a in CITIES for b in CITIES if CITIES[a][2] != CITIES[b][2]
+}
+
+
+def country_of(address):
+    """Country named in an address (the latest mention wins), or None."""
+    best, best_position = None, -1
+    for country, pattern in COUNTRY_PATTERNS.items():
+        for match in pattern.finditer(str(address)):
+            if match.start() > best_position:
+                best, best_position = country, match.start()
+    return best
+
+
+def locate(address, default=None):
+    """Known city for an address: a named city, else the country's gateway, else ``default``.
+
+    When the address names a country, only cities in that country count, so
+    'Birmingham, AL, USA' is the US gateway rather than Birmingham, UK.
+    """
+    country = country_of(address)
+    cities = [_CITY_NAMES[match.lower()] for match in _CITY.findall(str(address))]
+    if country is not None:
+        cities = [city for city in cities if CITIES[city][2] == country]
+    if cities:
+        return cities[-1]
+    return COUNTRY_GATEWAYS.get(country, default)
+
+
+def lane_distance_km(origin_address, destination_address, default_origin='Mumbai'):
+    """Great-circle km between two addresses, or None when the destination is unknown."""
+    origin = locate(origin_address, default_origin)
+    destination = locate(destination_address)
+    if origin is None or destination is None:
+        return None
+    if origin == destination:
+        return 0.0
+    return DISTANCE_KM.get((origin, destination)) or great_circle_km(CITIES[origin], CITIES[destination])
+
+
+def factor_per_kg_km(mode):
+    """kg CO₂ per kg per great-circle km for a mode, including its route uplift."""
+    mode = str(mode).strip().title()
+    return EMISSION_FACTORS.get(mode, EMISSION_FACTORS['Air']) * DISTANCE_UPLIFT.get(mode, 1.0) / 1000
+
+
+def emissions_kg(modes, distance_km, weight_kg):
+    """kg CO₂ for each transport mode over one lane and chargeable weight."""
+    return [round(factor_per_kg_km(mode) * distance_km * weight_kg, 3) for mode in modes]
+
+
+def annotate_emissions(options, distance_km, weight_kg):
+    """Replace each option's ``co2_emissions`` with the calculated value and add numeric ``co2_kg``."""
+    for option, co2 in zip(options, emissions_kg([o.get('mode', 'Air') for o in options], distance_km, weight_kg)):
+        option['co2_kg'] = co2
+        option['co2_emissions'] = f"{co2:.2f} kg"
+    return options
@@ -0,0 +1,23 @@
+def event_value(event, key, default=None):
+    """Read a field from a pipeline event, unwrapping DynamoDB-style ``{'S': ...}`` values."""
+    value = event.get(key, default)
+    if isinstance(value, dict):
+        for type_key in ('S', 'N', 'BOOL'):
+            if type_key in value:
+                return value[type_key]
+    return value
+
+
+def hazard_flag(event):
+    """True/False for a clean ``HAZARDOUS``/``NON-HAZARDOUS`` classification, None for anything else.
+
+    Missing, empty or free-text classifications are not treated as safe:
+    callers must fall back (e.g. to the model) rather than price them as
+    non-hazardous.
+    """
+    label = str(event_value(event, 'hazard_classification', '') or '').strip().upper()
+    if label == 'HAZARDOUS':
+        return True
+    if label == 'NON-HAZARDOUS':
+        return False
+    return None
@@ -0,0 +1,108 @@
+"""In-process stand-ins for AWS clients, for local runs and latency experiments.
+
+    python -m exportedge_common.fakes 500   # p50/p99 with and without hedging
+"""
+import io
+import json
+import random
+import sys
+import threading
+import time
+
+
+def long_tail_latency(median=0.8, tail_ratio=0.05, tail_factor=8.0):
+    """Latency sampler: lognormal around ``median`` with a ``tail_ratio`` share of slow outliers."""
+    def sample():
+        latency = random.lognormvariate(0, 0.3) * median
+        if random.random() < tail_ratio:
+            latency *= tail_factor
+        return latency
+    return sample
+
+
+class FakeBedrockClient:
+    """Answers ``invoke_model`` / ``invoke_model_with_response_stream`` like bedrock-runtime.
+
+    Each call sleeps for ``latency()`` seconds before responding (streams sleep
+    before the first chunk) and replies with ``text``.
+    """
+
+    def __init__(self, latency=None, text='NON-HAZARDOUS', chunk_delay=0.0):
+        self.latency = latency or long_tail_latency()
+        self.text = text
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _admit(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency())
+
+    def _usage(self, body):
+        return {'input_tokens': len(body) // 4, 'output_tokens': max(1, len(self.text) // 4)}
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None):
+        self._admit()
+        output = {'content': [{'type': 'text', 'text': self.text}], 'usage': self._usage(body)}
+        return {'body': io.BytesIO(json.dumps(output).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType=None, accept=None):
+        self._admit()
+        return {'body': self._events(body)}
+
+    def _events(self, body):
+        usage = self._usage(body)
+        yield self._chunk({'type': 'message_start', 'message': {'usage': {'input_tokens': usage['input_tokens']}}})
+        for word in self.text.split(' '):
+            yield self._chunk({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': word + ' '}})
+            time.sleep(self.chunk_delay)
+        yield self._chunk({'type': 'message_delta', 'usage': {'output_tokens': usage['output_tokens']}})
+
+    @staticmethod
+    def _chunk(message):
+        return {'chunk': {'bytes': json.dumps(message).encode('utf-8')}}
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def simulate_hedging(requests=500, concurrency=8, median=0.05, tail_ratio=0.05, tail_factor=20.0):
+    """Run the same workload against a long-tail fake with and without hedging; return latency stats."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from exportedge_common import bedrock
+    from exportedge_common.telemetry import NullExporter, set_exporter
+
+    set_exporter(NullExporter())
+    bedrock.rate_limiter = bedrock.TokenBucket(rate=1e6, capacity=1e6)
+    fake = FakeBedrockClient(long_tail_latency(median, tail_ratio, tail_factor))
+    bedrock.set_client(fake)
+    payload = bedrock.build_payload('Classify this product.', 8)
+
+    results = {}
+    for hedged in (False, True):
+        policy = bedrock.HedgePolicy(enabled=hedged, default_delay=median * 3, min_delay=median)
+        latencies = []
+
+        def call(_):
+            started = time.perf_counter()
+            bedrock.invoke_model_hedged(payload, stage='Simulation', policy=policy)
+            latencies.append(time.perf_counter() - started)
+
+        fake.calls = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(requests)))
+        results['hedged' if hedged else 'baseline'] = {
+            'p50_ms': round(_percentile(latencies, 0.5) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+            'model_calls': fake.calls,
+            **({'policy': policy.stats} if hedged else {})
+        }
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(simulate_hedging(int(sys.argv[1]) if len(sys.argv) > 1 else 500), indent=2))
@@ -0,0 +1,261 @@
+import json
+
+_CLOSERS = {'{': '}', '[': ']'}
+_LITERALS = ('true', 'false', 'null')
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+
+
+class JsonStreamExtractor:
+    """Incrementally extract the first JSON object from model output.
+
+    Text is consumed chunk by chunk in a single pass: prose and Markdown fences
+    before the object are skipped, insignificant whitespace is dropped, raw
+    control characters inside strings are escaped and trailing commas are
+    removed as they are seen. ``feed`` returns the parsed object as soon as its
+    closing brace arrives; ``finish`` repairs a truncated object (open strings,
+    dangling keys, partial literals, missing closers) at end of stream.
+
+    An object that opens the output or a ```` ```json ```` (or bare ```` ``` ````)
+    fence is the answer. Braces after prose may just be an example
+    (``Use the format {like this}.``), so such an object is kept only as a
+    fallback, used at end of stream if no fenced object turns up.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.result = None
+        self._fallback = None
+        self._leading = True
+        self._ticks = 0
+        self._in_fence = False
+        self._fence_info = ''
+        self._reading_info = False
+        self._reset()
+
+    def _reset(self):
+        self.started = False
+        self._speculative = False
+        self._out = []
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._pending_comma = False
+        self._expect_key = False
+        self._key_pending = False
+        self._bare_start = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text; return the parsed object once it is complete, else None."""
+        if self.done:
+            return self.result
+        for ch in chunk:
+            if not self.started:
+                self._scan(ch)
+                continue
+            if self._in_string:
+                self._string_char(ch)
+            elif ch == '`':
+                if self._speculative:
+                    # A fence after prose braces: they were not the answer
+                    self._abandon()
+                    self._scan(ch)
+                    continue
+                # Closing Markdown fence before the object closed: the output was truncated
+                return self.finish()
+            else:
+                self._structural_char(ch)
+            if self.done:
+                return self.result
+        return None
+
+    def finish(self):
+        """Repair and parse whatever has been consumed; raise ValueError if no object was found."""
+        if self.done:
+            return self.result
+        if self._fallback is not None and (not self.started or self._speculative):
+            self.result = self._fallback
+        elif not self.started:
+            raise ValueError("The AI did not return a valid JSON response.")
+        else:
+            self.result = self._repaired()
+        self.done = True
+        return self.result
+
+    def _scan(self, ch):
+        # Before the object: track Markdown fences and wait for an opening brace
+        if ch == '`':
+            self._ticks += 1
+            self._leading = False
+            if self._ticks == 3:
+                self._ticks = 0
+                self._in_fence = not self._in_fence
+                self._fence_info = ''
+                self._reading_info = self._in_fence
+            return
+        self._ticks = 0
+        if ch == '{':
+            fenced = self._in_fence and self._fence_info.strip().lower() in ('', 'json')
+            self.started = True
+            self._speculative = not (self._leading or fenced)
+            self._reading_info = False
+            self._open(ch)
+            return
+        if self._reading_info:
+            if ch == '\n':
+                self._reading_info = False
+            else:
+                self._fence_info += ch
+        if not ch.isspace():
+            self._leading = False
+
+    def _complete(self):
+        if not self._speculative:
+            self.result = self._decode()
+            self.done = True
+            return
+        try:
+            result = self._decode()
+        except ValueError:
+            result = None  # prose such as '{like this}'
+        if self._fallback is None:
+            self._fallback = result
+        self._reset()
+
+    def _abandon(self):
+        if self._fallback is None:
+            try:
+                self._fallback = self._repaired()
+            except ValueError:
+                pass
+        self._reset()
+
+    def _repaired(self):
+        if self._in_string:
+            if self._escape:
+                self._out.pop()
+            self._out.append('"')
+            self._in_string = False
+            self._end_string()
+        self._repair_bare_token()
+        self._pending_comma = False
+        if self._out and self._out[-1] == ':':
+            self._out.append('null')
+        elif self._key_pending:
+            self._out.append(':null')
+        while self._stack:
+            self._out.append(_CLOSERS[self._stack.pop()])
+        return self._decode()
+
+    def _decode(self):
+        text = ''.join(self._out)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Error decoding JSON: {e}") from e
+
+    def _open(self, ch):
+        self._out.append(ch)
+        self._stack.append(ch)
+        self._expect_key = ch == '{'
+
+    def _flush_comma(self):
+        if self._pending_comma:
+            self._out.append(',')
+            self._pending_comma = False
+
+    def _string_char(self, ch):
+        if self._escape:
+            self._out.append(ch)
+            self._escape = False
+        elif ch == '\\':
+            self._out.append(ch)
+            self._escape = True
+        elif ch == '"':
+            self._out.append(ch)
+            self._in_string = False
+            self._end_string()
+        elif ch < ' ':
+            self._out.append(_CONTROL_ESCAPES.get(ch, f'\\u{ord(ch):04x}'))
+        else:
+            self._out.append(ch)
+
+    def _end_string(self):
+        if self._expect_key and self._stack and self._stack[-1] == '{':
+            self._key_pending = True
+            self._expect_key = False
+
+    def _structural_char(self, ch):
+        if ch in ' \t\r\n':
+            self._repair_bare_token()
+            return
+        if ch in ',}]':
+            self._repair_bare_token()
+        if ch == ',':
+            # Held back until the next value: a trailing comma before a closer is dropped
+            self._pending_comma = True
+            self._expect_key = bool(self._stack) and self._stack[-1] == '{'
+            return
+        if ch in '}]':
+            self._pending_comma = False
+            if self._key_pending:
+                self._out.append(':null')
+                self._key_pending = False
+            if not self._stack:
+                return
+            opener = '{' if ch == '}' else '['
+            # Close any inner containers the model forgot before this closer
+            while self._stack and self._stack[-1] != opener:
+                self._out.append(_CLOSERS[self._stack.pop()])
+            if self._stack:
+                self._stack.pop()
+                self._out.append(ch)
+            self._expect_key = False
+            if not self._stack:
+                self._complete()
+            return
+        self._flush_comma()
+        if ch == ':':
+            self._out.append(ch)
+            self._key_pending = False
+        elif ch == '"':
+            self._out.append(ch)
+            self._in_string = True
+        elif ch in '{[':
+            self._open(ch)
+        else:
+            if self._bare_start is None:
+                self._bare_start = len(self._out)
+            self._out.append(ch)
+
+    def _repair_bare_token(self):
+        """Complete or drop a truncated number/literal such as ``tru`` or ``12.``."""
+        if self._bare_start is None:
+            return
+        token = ''.join(self._out[self._bare_start:])
+        self._bare_start = None
+        for literal in _LITERALS:
+            if literal.startswith(token):
+                del self._out[len(self._out) - len(token):]
+                self._out.append(literal)
+                return
+        stripped = token.rstrip('.eE+-')
+        if stripped != token:
+            del self._out[len(self._out) - len(token):]
+            self._out.append(stripped or 'null')
+
+
+def extract_json(text):
+    """Extract, repair and parse the first JSON object in ``text``."""
+    extractor = JsonStreamExtractor()
+    result = extractor.feed(text)
+    return result if extractor.done else extractor.finish()
+
+
+def extract_json_stream(chunks):
+    """Extract the first JSON object from an iterable of text chunks, stopping as soon as it closes."""
+    extractor = JsonStreamExtractor()
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            return extractor.result
+    return extractor.finish()
@@ -0,0 +1,187 @@
+import re
+from decimal import Decimal
+
+from exportedge_common.events import event_value
+
+# IATA volumetric divisor: cm³ per chargeable kg for air freight
+VOLUMETRIC_DIVISOR = 5000.0
+
+CM_PER_UNIT = {
+    'mm': 0.1, 'millimeter': 0.1, 'millimeters': 0.1, 'millimetre': 0.1, 'millimetres': 0.1,
+    'cm': 1.0, 'centimeter': 1.0, 'centimeters': 1.0, 'centimetre': 1.0, 'centimetres': 1.0,
+    'm': 100.0, 'meter': 100.0, 'meters': 100.0, 'metre': 100.0, 'metres': 100.0,
+    'in': 2.54, 'inch': 2.54, 'inches': 2.54, '"': 2.54,
+    'ft': 30.48, 'foot': 30.48, 'feet': 30.48,
+}
+
+KG_PER_UNIT = {
+    'mg': 1e-6,
+    'g': 0.001, 'gm': 0.001, 'gms': 0.001, 'gram': 0.001, 'grams': 0.001,
+    'kg': 1.0, 'kgs': 1.0, 'kilo': 1.0, 'kilos': 1.0, 'kilogram': 1.0, 'kilograms': 1.0,
+    'lb': 0.45359237, 'lbs': 0.45359237, 'pound': 0.45359237, 'pounds': 0.45359237,
+    'oz': 0.028349523, 'ounce': 0.028349523, 'ounces': 0.028349523,
+    't': 1000.0, 'tonne': 1000.0, 'tonnes': 1000.0,
+}
+
+
+# Not inside another number, so the '5' of a decimal comma ('30,5') is never read alone
+_NUMBER = r'(?<![\d.])(?<!\d,)(-?\d+(?:\.\d+)?)'
+_UNIT = r'(?:\s*([a-z]+|"))?'
+_BY = r'\s*(?:x|\*|×|by)\s*'
+# 'A x B x C unit' (each number may carry its own unit) and 'L 30cm W 20cm H 10cm'
+_DIMENSIONS = re.compile(_NUMBER + _UNIT + _BY + _NUMBER + _UNIT + _BY + _NUMBER + _UNIT + r'(?![a-z])', re.IGNORECASE)
+_LABELLED_DIMENSIONS = re.compile(
+    r'\bL\s*[:=]?\s*' + _NUMBER + _UNIT + r'[\s,]*\bW\s*[:=]?\s*' + _NUMBER + _UNIT
+    + r'[\s,]*\bH\s*[:=]?\s*' + _NUMBER + _UNIT + r'(?![a-z])', re.IGNORECASE
+)
+_WEIGHT = re.compile(_NUMBER + _UNIT, re.IGNORECASE)
+_QUANTITY = re.compile(_NUMBER + r'(?:\s*[a-z][a-z. ]*)?', re.IGNORECASE)
+_PRICE = re.compile(_NUMBER)
+# '3-5 days', '3 to 5 days' or '2 days'
+_DAYS = re.compile(_NUMBER + r'(?:\s*(?:-|–|to)\s*(\d+(?:\.\d+)?))?', re.IGNORECASE)
+
+
+# Western ('1,299,000') and Indian ('12,99,000') digit grouping
+_THOUSANDS = re.compile(r'\b(?:\d{1,3}(?:,\d{3})+|\d{1,2}(?:,\d{2})+,\d{3})(?![\d,])')
+
+
+def _clean(value):
+    # Commas are only accepted as thousands separators ('1,000'); a decimal
+    # comma ('2,5 kg') is left in place and fails to parse rather than becoming 25
+    return _THOUSANDS.sub(lambda match: match.group().replace(',', ''), str(value)).strip()
+
+
+def _positive(number, value, kind):
+    amount = float(number)
+    if amount <= 0:
+        raise ValueError(f"Invalid {kind}: {value!r}")
+    return amount
+
+
+def _factor(unit, factors, value, kind):
+    if unit.lower() not in factors:
+        raise ValueError(f"Unknown {kind} unit {unit!r} in {value!r}")
+    return factors[unit.lower()]
+
+
+def parse_dimensions(value):
+    """Parse ``'30x20x10 cm'``, ``'12 in x 8 in x 4 in'`` or ``'L 30cm W 20cm H 10cm'`` into cm.
+
+    A unit applies to the bare numbers before it, so ``'30 x 20 x 10 cm'`` is
+    all centimetres; with no unit at all centimetres are assumed. Only numbers
+    in one of those patterns count, so ``'15.6 inch laptop, 35x25x2 cm'`` is
+    35 x 25 x 2 cm. Unknown units and non-positive sides are rejected.
+    """
+    cleaned = _clean(value)
+    match = _DIMENSIONS.search(cleaned) or _LABELLED_DIMENSIONS.search(cleaned)
+    if not match:
+        raise ValueError(f"Invalid dimensions: {value!r}")
+    groups = match.groups()
+    dimensions = []
+    unit = 'cm'
+    for number, token_unit in reversed(list(zip(groups[0::2], groups[1::2]))):
+        unit = token_unit or unit
+        dimensions.append(_positive(number, value, 'dimensions') * _factor(unit, CM_PER_UNIT, value, 'length'))
+    return tuple(reversed(dimensions))
+
+
+def parse_weight(value):
+    """Parse ``'2.5 kg'``, ``'800g'`` or ``'3 lbs'`` into kg (kg when no unit is given).
+
+    The value must be a single positive weight in a known unit: ``'5 tons'``
+    or ``'-2 kg'`` raise rather than guessing.
+    """
+    match = _WEIGHT.fullmatch(_clean(value))
+    if not match:
+        raise ValueError(f"Invalid weight: {value!r}")
+    return _positive(match.group(1), value, 'weight') * _factor(match.group(2) or 'kg', KG_PER_UNIT, value, 'weight')
+
+
+def parse_quantity(value):
+    """Parse ``'10'``, ``'10 units'`` or ``'1,000 pcs'`` into a positive int.
+
+    Zero, negative and fractional counts (``'2.7'``) raise ValueError.
+    """
+    match = _QUANTITY.fullmatch(_clean(value))
+    if not match:
+        raise ValueError(f"Invalid quantity: {value!r}")
+    quantity = _positive(match.group(1), value, 'quantity')
+    if not quantity.is_integer():
+        raise ValueError(f"Invalid quantity: {value!r}")
+    return int(quantity)
+
+
+def parse_price(value):
+    """Parse a price such as ``'₹1,299.50'``, ``'$40'`` or ``'4200 INR'`` into a positive Decimal."""
+    match = _PRICE.search(_clean(value))
+    if not match or Decimal(match.group(1)) <= 0:
+        raise ValueError(f"Invalid price: {value!r}")
+    return Decimal(match.group(1))
+
+
+def parse_days(value):
+    """Midpoint of a delivery time such as ``'3-5 days'`` or ``'2 days'``."""
+    match = _DAYS.search(_clean(value))
+    if not match or float(match.group(1)) < 0:
+        raise ValueError(f"Invalid delivery time: {value!r}")
+    low = float(match.group(1))
+    return (low + float(match.group(2) or low)) / 2
+
+
+def volumetric_weight(dimensions_cm, divisor=VOLUMETRIC_DIVISOR):
+    length, width, height = dimensions_cm
+    return length * width * height / divisor
+
+
+def parse_measurements(order):
+    """Typed, unit-normalized measurements for an order's product fields.
+
+    ``product_weight`` and ``product_dimensions`` are per unit; the shipment
+    totals multiply them by ``product_quantity`` (1 when it is missing).
+    Fields that cannot be parsed are listed in ``invalid`` and the values that
+    depend on them are None (an invalid quantity makes every total None), so
+    callers can fall back or reject cheaply.
+    """
+    invalid = []
+
+    def parse(field, parser):
+        value = event_value(order, field)
+        if value in (None, ''):
+            invalid.append(field)
+            return None
+        try:
+            return parser(value)
+        except ValueError:
+            invalid.append(field)
+            return None
+
+    dimensions = parse('product_dimensions', parse_dimensions)
+    weight = parse('product_weight', parse_weight)
+    if event_value(order, 'product_quantity') in (None, ''):
+        quantity = 1
+    else:
+        quantity = parse('product_quantity', parse_quantity)
+
+    unit_volumetric = volumetric_weight(dimensions) if dimensions else None
+    total_weight = weight * quantity if weight is not None and quantity is not None else None
+    total_volumetric = unit_volumetric * quantity if unit_volumetric is not None and quantity is not None else None
+
+    return {
+        "dimensions_cm": [round(d, 2) for d in dimensions] if dimensions else None,
+        "weight_kg": round(weight, 3) if weight is not None else None,
+        "quantity": quantity,
+        "volumetric_weight_kg": round(total_volumetric, 3) if total_volumetric is not None else None,
+        "total_weight_kg": round(total_weight, 3) if total_weight is not None else None,
+        # Carriers bill the greater of actual and volumetric weight
+        "chargeable_weight_kg": (round(max(total_weight, total_volumetric or 0.0), 3)
+                                 if total_weight is not None else None),
+        "invalid": invalid
+    }
+
+
+def order_measurements(order):
+    """Measurements attached by ExtractOrderDetails, parsed on demand when absent."""
+    measurements = order.get('measurements')
+    if isinstance(measurements, dict):
+        return measurements
+    return parse_measurements(order)
@@ -0,0 +1,343 @@
+import copy
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from exportedge_common.telemetry import record_metrics
+
+MERGE_ALL = '*'
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails or reports ``status: error``."""
+
+    def __init__(self, stage, message):
+        super().__init__(f"{stage}: {message}")
+        self.stage = stage
+
+
+_load_lock = threading.Lock()
+
+
+def load_module(path):
+    """Import a Lambda function's module from its source file, once per process.
+
+    The handler's directory is put on ``sys.path`` so modules deployed next to
+    it (e.g. ``pricing_rules.py``) resolve the same way they do in Lambda. The
+    module is registered in ``sys.modules`` so helpers such as speculation
+    predictors share its warm caches.
+    """
+    path = os.path.abspath(path)
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    with _load_lock:
+        module = sys.modules.get(module_name)
+        if module is not None and os.path.abspath(getattr(module, '__file__', '') or '') == path:
+            return module
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[module_name]
+            raise
+        return module
+
+
+def load_handler(path, attribute='lambda_handler'):
+    """Import a Lambda handler from its source file."""
+    return getattr(load_module(path), attribute)
+
+
+class Node:
+    """One pipeline stage: a Lambda handler plus the event fields it reads and writes.
+
+    ``outputs`` lists the fields merged back into the order event; ``'*'``
+    means the handler's whole result replaces the event (e.g. the extract step).
+    ``speculate`` maps input fields to predictors ``(event) -> value or None``;
+    the node may then start before those fields' producers finish (see
+    ``Pipeline.run``).
+    """
+
+    def __init__(self, name, handler, inputs=(), outputs=(), path=None, attribute='lambda_handler',
+                 speculate=None):
+        self.name = name
+        self._handler = handler
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.path = path
+        self.attribute = attribute
+        self.speculate = dict(speculate or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, name, path, inputs=(), outputs=(), attribute='lambda_handler', speculate=None):
+        return cls(name, None, inputs, outputs, path=path, attribute=attribute, speculate=speculate)
+
+    @property
+    def handler(self):
+        with self._lock:
+            if self._handler is None:
+                self._handler = load_handler(self.path, self.attribute)
+        return self._handler
+
+    def updates(self, result):
+        """Return the event updates produced by ``result``."""
+        if not isinstance(result, dict):
+            raise StageError(self.name, f"expected a dict result, got {type(result).__name__}")
+        if result.get('status') == 'error':
+            raise StageError(self.name, result.get('message', 'stage reported an error'))
+        if MERGE_ALL in self.outputs:
+            return result
+        missing = [field for field in self.outputs if field not in result]
+        if missing:
+            raise StageError(self.name, f"result is missing outputs {missing}")
+        return {field: result[field] for field in self.outputs}
+
+
+class Pipeline:
+    """Dependency graph of order stages, runnable in-process or exportable to Step Functions.
+
+    A node depends on the latest earlier node that produces any of its inputs
+    and on the latest node that replaced the whole event; nodes without a
+    dependency path between them run concurrently.
+    """
+
+    def __init__(self, nodes, max_workers=4, speculate=True):
+        self.nodes = list(nodes)
+        self.max_workers = max_workers
+        self.speculate = speculate
+        self.input_producers = {}
+        self.dependencies = self._resolve_dependencies()
+        self.speculation_stats = {'attempts': 0, 'hits': 0, 'misses': 0, 'cancelled': 0, 'wasted_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _resolve_dependencies(self):
+        dependencies = {}
+        producers = {}
+        replace_node = None
+        for node in self.nodes:
+            self.input_producers[node.name] = {field: producers[field] for field in node.inputs if field in producers}
+            deps = set(self.input_producers[node.name].values())
+            if replace_node is not None:
+                deps.add(replace_node)
+            if MERGE_ALL in node.outputs:
+                # Anything produced so far feeds the replacement step
+                deps |= set(producers.values())
+            dependencies[node.name] = deps
+            if MERGE_ALL in node.outputs:
+                replace_node = node.name
+                producers = {}
+            else:
+                for field in node.outputs:
+                    producers[field] = node.name
+        return dependencies
+
+    def levels(self):
+        """Group nodes into waves whose members can run concurrently."""
+        depth = {}
+        for node in self.nodes:
+            depth[node.name] = 1 + max((depth[d] for d in self.dependencies[node.name]), default=-1)
+        waves = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for node in self.nodes:
+            waves[depth[node.name]].append(node)
+        return waves
+
+    def _speculable_fields(self, node, done):
+        """Fields a node still waits on if all of them can be predicted, else None."""
+        waiting = {field: producer for field, producer in self.input_producers[node.name].items()
+                   if producer not in done}
+        unfinished = self.dependencies[node.name] - done
+        # Only speculate past producers whose every field this node reads can be predicted
+        if not waiting or set(waiting.values()) != unfinished or not set(waiting) <= set(node.speculate):
+            return None
+        return list(waiting)
+
+    def _predict(self, node, event, fields):
+        """Predicted values for ``fields``, or None when any predictor declines."""
+        predicted = {}
+        for field in fields:
+            try:
+                value = node.speculate[field](event)
+            except Exception as e:
+                print(f"Speculation predictor for {node.name}.{field} failed: {e}")
+                return None
+            if value is None:
+                return None
+            predicted[field] = value
+        return predicted
+
+    def _record_speculation(self, node, hit):
+        with self._stats_lock:
+            self.speculation_stats['attempts'] += 1
+            self.speculation_stats['hits' if hit else 'misses'] += 1
+            hit_rate = self.speculation_stats['hits'] / self.speculation_stats['attempts']
+        print(f"Speculative {node.name} {'hit' if hit else 'miss'} (hit rate {hit_rate:.2f})")
+        record_metrics({'Stage': node.name}, [('SpeculationHit', 'Count'), ('SpeculationMiss', 'Count')],
+                       {'SpeculationHit': int(hit), 'SpeculationMiss': int(not hit)})
+
+    @staticmethod
+    def _timed(handler, started):
+        """``handler`` that notes in ``started`` when it actually begins running."""
+        def run(event, context):
+            started['at'] = time.perf_counter()
+            return handler(event, context)
+        return run
+
+    def _discard_speculation(self, future, started):
+        """Cancel a missed speculation that has not started yet.
+
+        A handler that is already running cannot be interrupted; it finishes in
+        the background and its run time is added to ``wasted_seconds``.
+        """
+        if future.cancel():
+            with self._stats_lock:
+                self.speculation_stats['cancelled'] += 1
+            return
+
+        def record_waste(_):
+            with self._stats_lock:
+                self.speculation_stats['wasted_seconds'] += time.perf_counter() - started['at']
+        future.add_done_callback(record_waste)
+
+    def run(self, event, context=None):
+        """Run one order event through the graph and return the merged event.
+
+        A node with ``speculate`` predictors starts as soon as everything it
+        waits on is predictable, using the predicted values. When the real
+        producers finish, the speculative result is committed if every
+        prediction matched; otherwise it is cancelled (or, if already running,
+        left to finish and counted in ``wasted_seconds``) and the node reruns.
+        """
+        event = copy.deepcopy(event)
+        pending = {node.name: node for node in self.nodes}
+        done = set()
+        running = {}
+        speculations = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, node in list(pending.items()):
+                    if self.dependencies[name] <= done:
+                        speculation = speculations.pop(name, None)
+                        if speculation:
+                            future, predicted, started = speculation
+                            hit = all(event.get(field) == value for field, value in predicted.items())
+                            if hit and not (future.done() and future.exception() is not None):
+                                self._record_speculation(node, True)
+                                running[future] = node
+                                del pending[name]
+                                continue
+                            self._record_speculation(node, False)
+                            self._discard_speculation(future, started)
+                        # Each stage gets its own snapshot so concurrent stages cannot
+                        # see or clobber each other's in-place event edits
+                        running[executor.submit(node.handler, copy.deepcopy(event), context)] = node
+                        del pending[name]
+                    elif self.speculate and node.speculate and name not in speculations:
+                        fields = self._speculable_fields(node, done)
+                        if fields is None:
+                            continue
+                        # Predict once per order; a declined prediction waits for the real values
+                        predicted = self._predict(node, event, fields)
+                        speculations[name] = None
+                        if predicted is not None:
+                            snapshot = copy.deepcopy(event)
+                            snapshot.update(predicted)
+                            started = {}
+                            future = executor.submit(self._timed(node.handler, started), snapshot, context)
+                            speculations[name] = (future, predicted, started)
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    result = future.result()
+                    updates = node.updates(result)
+                    timings = event.get('stage_timings', {})
+                    if MERGE_ALL in node.outputs:
+                        event = copy.deepcopy(updates)
+                    else:
+                        event.update(updates)
+                    # Per-stage telemetry summaries (see exportedge_common.telemetry) are
+                    # merged from every stage, not only those declaring the field
+                    timings.update(result.get('stage_timings') or {})
+                    if timings:
+                        event['stage_timings'] = timings
+                    done.add(node.name)
+        return event
+
+    def run_batch(self, events, context=None, max_orders=4):
+        """Run many order events, ``max_orders`` at a time, preserving input order."""
+        with ThreadPoolExecutor(max_workers=max_orders) as executor:
+            return list(executor.map(lambda e: self.run(e, context), events))
+
+    def state_machine(self, function_arns=None, comment="Order processing pipeline"):
+        """Build an Amazon States Language definition with Parallel states per wave.
+
+        ``function_arns`` maps node names to Lambda ARNs; unmapped nodes use a
+        ``${<Name>Arn}`` placeholder for ``DefinitionSubstitutions``. The order
+        event is carried under ``$.event`` and each stage's outputs under
+        ``$._updates`` until a Pass state merges them, so the outputs never
+        leak into the event the next stage (or the caller) receives.
+        """
+        function_arns = function_arns or {}
+        states = {"WrapEvent": {"Type": "Pass", "Parameters": {"event.$": "$"}}}
+        order = ["WrapEvent"]
+
+        def task(node, result_path):
+            state = {"Type": "Task", "Resource": function_arns.get(node.name, f"${{{node.name}Arn}}")}
+            if MERGE_ALL not in node.outputs:
+                state["ResultSelector"] = {f"{field}.$": f"$.{field}" for field in node.outputs}
+                state["ResultPath"] = result_path
+            return state
+
+        for wave in self.levels():
+            if len(wave) == 1:
+                node = wave[0]
+                name = node.name
+                states[name] = dict(task(node, "$._updates"), InputPath="$.event")
+                if MERGE_ALL in node.outputs:
+                    # The whole result replaces the event
+                    states[name]["ResultPath"] = "$.event"
+                    merge = None
+                else:
+                    merge = "$._updates"
+            else:
+                name = "Parallel_" + "_".join(node.name for node in wave)
+                states[name] = {
+                    "Type": "Parallel",
+                    "InputPath": "$.event",
+                    "Branches": [
+                        {"StartAt": node.name, "States": {node.name: dict(task(node, "$"), End=True)}}
+                        for node in wave
+                    ],
+                    "ResultPath": "$._updates"
+                }
+                merge = "$._updates[0]"
+                for i in range(1, len(wave)):
+                    merge = f"States.JsonMerge({merge}, $._updates[{i}], false)"
+            order.append(name)
+            if merge is not None:
+                # Rebuilds the state as {"event": merged}, dropping _updates
+                merge_name = f"Merge_{name}"
+                states[merge_name] = {
+                    "Type": "Pass",
+                    "Parameters": {"event.$": f"States.JsonMerge($.event, {merge}, false)"}
+                }
+                order.append(merge_name)
+
+        for current, following in zip(order, order[1:]):
+            states[current]["Next"] = following
+        states[order[-1]]["OutputPath"] = "$.event"
+        states[order[-1]]["End"] = True
+        return {"Comment": comment, "StartAt": order[0], "States": states}
+
+    def state_machine_json(self, function_arns=None):
+        return json.dumps(self.state_machine(function_arns), indent=2)
@@ -0,0 +1,23 @@
+def min_max(values):
+    """Scale values to 0 (lowest) .. 1 (highest).
+
+    Missing (None) values rank worst; a constant column contributes nothing.
+    """
+    known = [value for value in values if value is not None]
+    low, high = (min(known), max(known)) if known else (0, 0)
+    return [1.0 if value is None else (value - low) / (high - low) if high > low else 0.0 for value in values]
+
+
+def weighted_best(rows, weights):
+    """Index of the row with the lowest weighted sum of min-max normalized criteria (lower is better).
+
+    ``rows`` are dicts of criterion to number (or None); ``weights`` maps each
+    criterion to its weight. Ties go to the earlier row; None for no rows.
+    """
+    if not rows:
+        return None
+    costs = [0.0] * len(rows)
+    for criterion, weight in weights.items():
+        for i, value in enumerate(min_max([row.get(criterion) for row in rows])):
+            costs[i] += weight * value
+    return costs.index(min(costs))
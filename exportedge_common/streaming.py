@@ -0,0 +1,128 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from exportedge_common.bedrock import DEFAULT_MODEL_ID, invoke_model_stream
+
+# Port the Lambda Web Adapter forwards requests to (AWS_LWA_PORT, default 8080)
+STREAM_PORT = int(os.environ.get('AWS_LWA_PORT', os.environ.get('PORT', 8080)))
+
+STREAM_HEADERS = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+def wants_stream(event, body):
+    """True when the client asked for Server-Sent Events instead of a JSON body."""
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    query = event.get('queryStringParameters') or {}
+    return (
+        'text/event-stream' in headers.get('accept', '')
+        or str(query.get('stream', '')).lower() == 'true'
+        or body.get('stream') is True
+    )
+
+
+def sse_event(data, event=None):
+    """Encode one Server-Sent Event frame."""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+def stream_completion(payload, model_id=DEFAULT_MODEL_ID, metadata=None, on_complete=None, stage=None):
+    """Yield SSE frames for a streamed completion.
+
+    Each text delta is sent as a ``delta`` event as soon as Bedrock produces
+    it, followed by a ``done`` event carrying ``metadata`` (or an ``error``
+    event if the stream fails part way). ``on_complete`` receives the full
+    text of a successful stream, e.g. to cache it. ``stage`` names the
+    caller in the call's telemetry record.
+    """
+    parts = []
+    try:
+        for text in invoke_model_stream(payload, model_id=model_id, stage=stage):
+            parts.append(text)
+            yield sse_event({"text": text}, event='delta')
+    except Exception as e:
+        print(f"Error: {e}")
+        yield sse_event({"error": str(e)}, event='error')
+        return
+    if on_complete is not None:
+        on_complete("".join(parts).strip())
+    yield sse_event(metadata or {}, event='done')
+
+
+def sse_response(frames):
+    """Response dict whose body is an iterable of SSE frames, sent with ``STREAM_HEADERS``."""
+    return {"statusCode": 200, "headers": STREAM_HEADERS, "body": frames}
+
+
+def request_event(request):
+    """API Gateway-style event (headers, query string, body) for an HTTP request."""
+    url = urlsplit(request.path)
+    event = {
+        "rawPath": url.path,
+        "headers": dict(request.headers.items()),
+        "queryStringParameters": dict(parse_qsl(url.query)) or None,
+    }
+    length = int(request.headers.get('Content-Length') or 0)
+    if length:
+        event["body"] = request.rfile.read(length).decode('utf-8')
+    return event
+
+
+def write_response(request, response):
+    """Write a handler's response dict; an iterable body is sent chunk by chunk as it is produced."""
+    body = response.get('body')
+    request.send_response(response.get('statusCode', 200))
+    for name, value in (response.get('headers') or {}).items():
+        request.send_header(name, value)
+    if body is None or isinstance(body, (str, bytes)):
+        data = body.encode('utf-8') if isinstance(body, str) else (body or b'')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+        return
+    request.send_header('Transfer-Encoding', 'chunked')
+    request.end_headers()
+    for frame in body:
+        if frame:
+            request.wfile.write(b'%x\r\n%s\r\n' % (len(frame), frame))
+            request.wfile.flush()
+    request.wfile.write(b'0\r\n\r\n')
+
+
+def make_server(handler, port=STREAM_PORT, host='0.0.0.0'):
+    """HTTP server that answers POSTs with ``handler(event, None)``.
+
+    This is the app behind the Lambda Web Adapter: with
+    ``AWS_LWA_INVOKE_MODE=response_stream`` the adapter relays each chunk to
+    the Function URL as soon as it is written, which a plain Python handler
+    cannot do. GET answers the adapter's readiness check.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            write_response(self, handler(request_event(self), None))
+
+        def do_GET(self):
+            write_response(self, {"statusCode": 200, "headers": {"Content-Type": "application/json"},
+                                  "body": json.dumps({"status": "ok"})})
+
+        def do_OPTIONS(self):
+            write_response(self, {"statusCode": 204, "headers": {
+                k: v for k, v in STREAM_HEADERS.items() if k.startswith('Access-Control')
+            }})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(handler, port=STREAM_PORT):
+    print(f"Serving on port {port}")
+    make_server(handler, port).serve_forever()
@@ -0,0 +1,201 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ExportEdge/LLM')
+
+# USD per million tokens (input, output) by model family; cache reads bill at
+# 10% of the input price and cache writes at 125%
+MODEL_PRICES = {
+    'claude-3-5-sonnet': (3.00, 15.00),
+    'claude-3-5-haiku': (0.80, 4.00),
+    'claude-3-haiku': (0.25, 1.25),
+}
+
+CALL_METRICS = [
+    ('LatencyMs', 'Milliseconds'),
+    ('InputTokens', 'Count'),
+    ('OutputTokens', 'Count'),
+    ('CacheReadTokens', 'Count'),
+    ('Retries', 'Count'),
+    ('Throttles', 'Count'),
+    ('Errors', 'Count'),
+    ('EstimatedCostUSD', 'None'),
+]
+
+_current_stage = contextvars.ContextVar('exportedge_stage', default=None)
+
+
+class StdoutExporter:
+    """Print EMF records; CloudWatch Logs turns them into metrics."""
+
+    def export(self, record):
+        print(json.dumps(record))
+
+
+class FileExporter:
+    """Append records as JSON lines to a local file, for offline runs and tests."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, record):
+        with self.lock, open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+class NullExporter:
+    def export(self, record):
+        pass
+
+
+def _default_exporter():
+    kind = os.environ.get('TELEMETRY_EXPORTER', 'emf')
+    if kind == 'file':
+        return FileExporter(os.environ.get('TELEMETRY_FILE', '/tmp/exportedge-telemetry.jsonl'))
+    if kind == 'none':
+        return NullExporter()
+    return StdoutExporter()
+
+
+exporter = _default_exporter()
+
+
+def set_exporter(new_exporter):
+    """Replace the process-wide exporter (e.g. with a FileExporter in tests)."""
+    global exporter
+    exporter = new_exporter
+
+
+def estimate_cost(model_id, input_tokens, output_tokens, cache_read_tokens=0, cache_write_tokens=0):
+    for family, (input_price, output_price) in MODEL_PRICES.items():
+        if family in model_id:
+            return round((
+                input_tokens * input_price
+                + output_tokens * output_price
+                + cache_read_tokens * input_price * 0.10
+                + cache_write_tokens * input_price * 1.25
+            ) / 1_000_000, 6)
+    return 0.0
+
+
+def emf_record(dimensions, metrics, values, properties=None):
+    """Build a CloudWatch Embedded Metric Format record."""
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name, unit in metrics]
+            }]
+        }
+    }
+    record.update(dimensions)
+    record.update(values)
+    record.update(properties or {})
+    return record
+
+
+def record_metrics(dimensions, metrics, values, properties=None):
+    """Export one EMF record; telemetry failures are logged, never raised."""
+    try:
+        exporter.export(emf_record(dimensions, metrics, values, properties))
+    except Exception as e:
+        print(f"Telemetry export failed: {e}")
+
+
+class StageRecord:
+    """Accumulates the LLM calls made while one stage handles one order."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.calls = []
+        self.duration_ms = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, call):
+        with self.lock:
+            self.calls.append(call)
+
+    def summary(self):
+        with self.lock:
+            calls = list(self.calls)
+        return {
+            "duration_ms": round(self.duration_ms, 1),
+            "llm_calls": len(calls),
+            "llm_latency_ms": round(sum(c['LatencyMs'] for c in calls), 1),
+            "input_tokens": sum(c['InputTokens'] for c in calls),
+            "output_tokens": sum(c['OutputTokens'] for c in calls),
+            "retries": sum(c['Retries'] for c in calls),
+            "throttles": sum(c['Throttles'] for c in calls),
+            "cost_usd": round(sum(c['EstimatedCostUSD'] for c in calls), 6)
+        }
+
+
+def current_stage_name():
+    record = _current_stage.get()
+    return record.stage if record else 'Unknown'
+
+
+def record_llm_call(model_id, latency_ms, usage=None, retries=0, throttles=0, error=None, stage=None, streamed=False):
+    """Emit one LLM call record and add it to the current stage's summary."""
+    usage = usage or {}
+    input_tokens = usage.get('input_tokens', 0) or 0
+    output_tokens = usage.get('output_tokens', 0) or 0
+    cache_read = usage.get('cache_read_input_tokens', 0) or 0
+    cache_write = usage.get('cache_creation_input_tokens', 0) or 0
+    values = {
+        'LatencyMs': round(latency_ms, 1),
+        'InputTokens': input_tokens,
+        'OutputTokens': output_tokens,
+        'CacheReadTokens': cache_read,
+        'Retries': retries,
+        'Throttles': throttles,
+        'Errors': int(error is not None),
+        'EstimatedCostUSD': estimate_cost(model_id, input_tokens, output_tokens, cache_read, cache_write),
+    }
+    properties = {'Streamed': streamed}
+    if error is not None:
+        properties['Error'] = str(error)
+    record = _current_stage.get()
+    record_metrics({'Stage': stage or current_stage_name(), 'ModelId': model_id}, CALL_METRICS, values, properties)
+    if record is not None:
+        record.add(values)
+    return values
+
+
+def instrument_stage(stage, attach=True):
+    """Decorate a Lambda handler so its LLM calls are attributed to ``stage``.
+
+    Emits a ``StageDurationMs`` record per invocation and, when ``attach`` is
+    set and the handler returns the order event, adds the stage's summary to
+    ``event['stage_timings'][stage]``.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            record = StageRecord(stage)
+            token = _current_stage.set(record)
+            started = time.perf_counter()
+            try:
+                result = handler(event, context)
+            finally:
+                record.duration_ms = (time.perf_counter() - started) * 1000
+                _current_stage.reset(token)
+                record_metrics({'Stage': stage}, [('StageDurationMs', 'Milliseconds')],
+                               {'StageDurationMs': round(record.duration_ms, 1)}, {'Summary': record.summary()})
+            if attach and isinstance(result, dict) and result.get('status') != 'error':
+                result.setdefault('stage_timings', {})[stage] = record.summary()
+            return result
+        return wrapper
+    return decorator
+
+
+def submit_in_stage(executor, fn, *args, **kwargs):
+    """Submit ``fn`` to ``executor`` so its LLM calls count towards the caller's stage."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
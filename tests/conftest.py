@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Keep the telemetry exporter quiet; set before any stage module is imported
+os.environ.setdefault('TELEMETRY_EXPORTER', 'none')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each Lambda directory is its own deploy unit whose helper modules are
+# imported by plain name, so put the directories under test on sys.path
+for path in (ROOT, os.path.join(ROOT, 'CarrierPricing'), os.path.join(ROOT, 'CustomerPricingLogic'),
+             os.path.join(ROOT, 'compliance-agent'), os.path.join(ROOT, 'HazardClassification'),
+             os.path.join(ROOT, 'NegotiationWithCarrier'), os.path.join(ROOT, 'OrderPipeline')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
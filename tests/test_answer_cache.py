@@ -0,0 +1,57 @@
+import importlib
+
+import pytest
+
+import answer_cache
+
+compliance_lambda = importlib.import_module('lambda')
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, 'answer_cache', answer_cache.build_cache('test-answer', ttl_seconds=60))
+    monkeypatch.setattr(answer_cache, '_recent', answer_cache.OrderedDict())
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    answer_cache.store('What documents do I need for the USA?', 'en', 'IEC and invoice')
+    answer, metadata = answer_cache.lookup('what documents do i need for the usa', 'en')
+    assert answer == 'IEC and invoice'
+    assert metadata['match'] == 'exact'
+    assert answer_cache.lookup('What documents do I need for the USA?', 'hi')[0] is None
+
+
+def test_near_duplicates_are_off_by_default():
+    answer_cache.store('documents for lithium battery export to USA', 'en', 'answer')
+    assert answer_cache.lookup('documents needed for lithium battery exports to USA', 'en')[0] is None
+
+
+def test_near_duplicate_hit_when_enabled(monkeypatch):
+    monkeypatch.setattr(answer_cache, 'NEAR_DUPLICATE_THRESHOLD', 0.6)
+    answer_cache.store('documents for lithium battery export to USA by air', 'en', 'answer')
+    answer, metadata = answer_cache.lookup('lithium battery export to USA by air documents please', 'en')
+    assert answer == 'answer'
+    assert metadata['match'] == 'near'
+
+
+@pytest.mark.parametrize('question', [
+    'documents for lithium battery export to UK by air',
+    'documents for HS 8506 lithium battery export to USA by air',
+])
+def test_near_duplicates_must_match_countries_and_hs_codes(monkeypatch, question):
+    monkeypatch.setattr(answer_cache, 'NEAR_DUPLICATE_THRESHOLD', 0.5)
+    answer_cache.store('documents for HS 8507 lithium battery export to USA by air', 'en', 'answer')
+    assert answer_cache.lookup(question, 'en')[0] is None
+
+
+def test_handler_answers_from_cache_without_retrieval(monkeypatch):
+    answer_cache.store('Do I need an IEC?', 'en', 'Yes.')
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError('retrieval or model call on a cache hit')
+
+    monkeypatch.setattr(compliance_lambda, 'build_payload', unexpected)
+    monkeypatch.setattr(compliance_lambda, 'invoke_model', unexpected)
+    response = compliance_lambda.lambda_handler({'user_input': 'do i need an IEC', 'language': 'en'}, None)
+    assert response['statusCode'] == 200
+    assert '"Yes."' in response['body']
@@ -0,0 +1,38 @@
+from exportedge_common.bedrock import (
+    CHARS_PER_TOKEN, DEFAULT_MODEL_ID, build_cached_payload, payload_for_model, prompt_cache_min_tokens
+)
+
+LONG_PREFIX = 'x' * (2048 * CHARS_PER_TOKEN)
+OLD_SONNET = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+HAIKU = 'anthropic.claude-3-5-haiku-20241022-v1:0'
+
+
+def marked(payload):
+    return 'cache_control' in payload['system'][0]
+
+
+def test_short_prefixes_are_not_marked():
+    assert not marked(build_cached_payload('Be brief.', 'hi', 100))
+
+
+def test_long_prefix_is_marked_for_caching_models():
+    assert marked(build_cached_payload(LONG_PREFIX, 'hi', 100))
+    assert marked(build_cached_payload(LONG_PREFIX, 'hi', 100, model_id='us.' + DEFAULT_MODEL_ID))
+
+
+def test_models_without_prompt_caching_never_get_a_marker():
+    assert prompt_cache_min_tokens(OLD_SONNET) is None
+    assert not marked(build_cached_payload(LONG_PREFIX, 'hi', 100, model_id=OLD_SONNET))
+
+
+def test_haiku_needs_a_longer_prefix():
+    prefix = 'x' * (1500 * CHARS_PER_TOKEN)
+    assert marked(build_cached_payload(prefix, 'hi', 100))
+    assert not marked(build_cached_payload(prefix, 'hi', 100, model_id=HAIKU))
+
+
+def test_markers_are_stripped_for_a_model_without_caching():
+    payload = build_cached_payload(LONG_PREFIX, 'hi', 100)
+    assert not marked(payload_for_model(payload, OLD_SONNET))
+    assert payload_for_model(payload, DEFAULT_MODEL_ID) is payload
+    assert marked(payload)
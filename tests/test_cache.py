@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+import HazardClassification
+from exportedge_common import bedrock, cache
+from exportedge_common.cache import MemoryTier, TieredCache, build_cache, fingerprint
+from exportedge_common.fakes import FakeBedrockClient
+
+
+class BrokenTier:
+    name = 'broken'
+
+    def get(self, key):
+        raise RuntimeError('table unavailable')
+
+    def put(self, key, entry):
+        raise RuntimeError('table unavailable')
+
+    def delete(self, key):
+        raise RuntimeError('table unavailable')
+
+
+def advance(monkeypatch, seconds):
+    now = cache.time.time() + seconds
+    monkeypatch.setattr(cache.time, 'time', lambda: now)
+
+
+def test_fingerprint_ignores_case_and_whitespace():
+    assert fingerprint({'name': 'Phone  Case', 'dims': '10x5x1 cm'}) == \
+        fingerprint({'dims': '10x5x1 CM', 'name': ' phone case'})
+    assert fingerprint({'name': 'Phone Case'}) != fingerprint({'name': 'Phone Cover'})
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tiers = TieredCache([MemoryTier(max_entries=2)], ttl_seconds=60)
+    tiers.put('a', 1)
+    tiers.put('b', 2)
+    tiers.get('a')
+    tiers.put('c', 3)
+    assert (tiers.get('a'), tiers.get('b'), tiers.get('c')) == (1, None, 3)
+
+
+def test_cache_without_a_table_is_memory_only_and_bounded():
+    tiers = build_cache('test', ttl_seconds=60, max_entries=2)
+    assert [tier.name for tier in tiers.tiers] == ['memory']
+    for key in 'abc':
+        tiers.put(key, key)
+    assert len(tiers.tiers[0].entries) == 2
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    tiers = build_cache('test', ttl_seconds=60)
+    tiers.put('key', 'value')
+    advance(monkeypatch, 61)
+    assert tiers.lookup('key') == (None, None)
+
+
+def test_shared_tier_hit_is_copied_into_memory():
+    memory, shared = MemoryTier(), MemoryTier()
+    shared.name = 'shared'
+    tiers = TieredCache([memory, shared], ttl_seconds=60)
+    TieredCache([shared], ttl_seconds=60).put('key', 'value')
+    assert tiers.lookup('key')[1] == 'shared'
+    assert tiers.lookup('key')[1] == 'memory'
+
+
+def test_failing_tier_is_a_miss_not_an_error():
+    tiers = TieredCache([BrokenTier(), MemoryTier()], ttl_seconds=60)
+    tiers.put('key', 'value')
+    assert tiers.lookup('key')[1] == 'memory'
+    tiers.invalidate('key')
+    assert tiers.get('key') is None
+
+
+def test_stale_entries_are_served_while_refreshing(monkeypatch):
+    tiers = build_cache('test', ttl_seconds=60, stale_seconds=600)
+    tiers.put('key', 'old')
+    advance(monkeypatch, 120)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return 'new'
+
+    assert tiers.get_or_refresh('key', loader)[:2] == ('old', 'stale')
+    assert refreshed.wait(5)
+    tiers._refresh_executor.shutdown(wait=True)
+    assert tiers.get_or_refresh('key', loader)[:2] == ('new', 'fresh')
+
+
+@pytest.fixture
+def fake_bedrock(monkeypatch):
+    fake = FakeBedrockClient(latency=lambda: 0.0, text='NON-HAZARDOUS')
+    monkeypatch.setitem(bedrock._clients, None, fake)
+    monkeypatch.setattr(HazardClassification, 'hazard_cache', build_cache('test-hazard', ttl_seconds=60))
+    return fake
+
+
+def product(name='Cotton T-shirt'):
+    return {'product_name': name, 'product_specifications': '100% cotton, size M',
+            'product_dimensions': '30x20x2 cm', 'product_weight': '0.2 kg', 'product_quantity': '10'}
+
+
+def test_repeat_products_skip_the_model(fake_bedrock):
+    assert HazardClassification.lambda_handler(product(), None)['hazard_classification'] == 'NON-HAZARDOUS'
+    assert HazardClassification.lambda_handler(product(' cotton t-shirt '), None)['hazard_classification'] == \
+        'NON-HAZARDOUS'
+    assert fake_bedrock.calls == 1
+
+
+def test_invalidation_forces_a_new_classification(fake_bedrock):
+    HazardClassification.lambda_handler(product(), None)
+    HazardClassification.lambda_handler({**product(), 'invalidate_hazard_cache': True}, None)
+    HazardClassification.lambda_handler(product(), None)
+    assert fake_bedrock.calls == 2
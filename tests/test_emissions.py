@@ -0,0 +1,52 @@
+import pytest
+
+from exportedge_common.emissions import (
+    CITIES, EMISSION_FACTORS, annotate_emissions, country_of, emissions_kg, factor_per_kg_km, great_circle_km,
+    lane_distance_km, locate
+)
+
+
+@pytest.mark.parametrize('address, country', [
+    ('1 Main St, Springfield, U.S.', 'USA'),
+    ('1 Main St, Springfield, U.S.A.', 'USA'),
+    ('Perth, Scotland, UK', 'UK'),
+    ('Melbourne, FL, United States', 'USA'),
+    ('Andheri, Mumbai, India', 'India'),
+    ('Somewhere without a country', None),
+])
+def test_country_of(address, country):
+    assert country_of(address) == country
+
+
+@pytest.mark.parametrize('address, city', [
+    ('Birmingham, AL 35203, USA', 'New York'),
+    ('Melbourne, FL, United States', 'New York'),
+    ('Perth, Scotland, UK', 'London'),
+    ('Birmingham B1 1AA, UK', 'Birmingham'),
+    ('Perth WA 6000, Australia', 'Perth'),
+    ('Bangalore, Karnataka', 'Bengaluru'),
+    ('Unknown Town', None),
+])
+def test_cities_must_lie_in_the_named_country(address, city):
+    assert locate(address) == city
+
+
+def test_ambiguous_city_uses_the_gateway_distance():
+    assert lane_distance_km('Mumbai, India', 'Birmingham, AL 35203, USA') == \
+        pytest.approx(great_circle_km(CITIES['Mumbai'], CITIES['New York']))
+
+
+def test_great_circle_distance():
+    assert great_circle_km(CITIES['London'], CITIES['New York']) == pytest.approx(5570, rel=0.01)
+    assert lane_distance_km('London, UK', 'London, UK') == 0.0
+    assert lane_distance_km('Mumbai, India', 'Atlantis') is None
+
+
+def test_emissions_arithmetic():
+    distance_km, weight_kg = 1000.0, 10.0
+    assert factor_per_kg_km('air') == pytest.approx(EMISSION_FACTORS['Air'] * 1.09 / 1000)
+    assert emissions_kg(['Air', 'Sea'], distance_km, weight_kg) == [
+        round(0.602 * 1.09 * 10, 3), round(0.016 * 1.35 * 10, 3)
+    ]
+    options = annotate_emissions([{'mode': 'Sea'}], distance_km, weight_kg)
+    assert options == [{'mode': 'Sea', 'co2_kg': 0.216, 'co2_emissions': '0.22 kg'}]
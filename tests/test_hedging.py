@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+
+import pytest
+
+from exportedge_common import bedrock
+from exportedge_common.bedrock import (
+    HedgePolicy, LatencyTracker, SingleFlight, build_cached_payload, build_payload, invoke_model_coalesced,
+    invoke_model_hedged, invoke_model_stream_hedged, response_text
+)
+from exportedge_common.fakes import FakeBedrockClient
+
+HEDGE_REGION = 'us-east-1'
+OLD_SONNET = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+PAYLOAD = build_payload('Classify this product.', 8)
+
+
+class RecordingClient(FakeBedrockClient):
+    """Fake that also keeps the request bodies it received."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bodies = []
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None):
+        self.bodies.append(json.loads(body))
+        return super().invoke_model(modelId, body, contentType, accept)
+
+
+def fixed(seconds):
+    return lambda: seconds
+
+
+@pytest.fixture(autouse=True)
+def unlimited_rate(monkeypatch):
+    monkeypatch.setattr(bedrock, 'rate_limiter', bedrock.TokenBucket(rate=1e6, capacity=1e6))
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    def install(primary_latency, hedge_latency, text='NON-HAZARDOUS'):
+        primary = RecordingClient(fixed(primary_latency), text='primary ' + text)
+        hedge = RecordingClient(fixed(hedge_latency), text='hedge ' + text)
+        monkeypatch.setitem(bedrock._clients, None, primary)
+        monkeypatch.setitem(bedrock._clients, HEDGE_REGION, hedge)
+        return primary, hedge
+    return install
+
+
+def policy(**kwargs):
+    return HedgePolicy(enabled=True, default_delay=0.05, min_delay=0.01, region=HEDGE_REGION, **kwargs)
+
+
+def test_slow_primary_is_hedged_and_the_hedge_wins(clients):
+    primary, hedge = clients(0.5, 0.0)
+    hedging = policy()
+    started = time.perf_counter()
+    output = invoke_model_hedged(PAYLOAD, policy=hedging)
+    assert time.perf_counter() - started < 0.4
+    assert response_text(output) == 'hedge NON-HAZARDOUS'
+    assert hedging.stats == {'requests': 1, 'hedged': 1, 'hedge_wins': 1, 'over_budget': 0}
+
+
+def test_fast_primary_is_not_hedged(clients):
+    primary, hedge = clients(0.0, 0.0)
+    hedging = policy()
+    assert response_text(invoke_model_hedged(PAYLOAD, policy=hedging)) == 'primary NON-HAZARDOUS'
+    assert hedge.calls == 0
+    assert hedging.stats['hedged'] == 0
+
+
+def test_hedges_stop_when_the_budget_is_spent(clients):
+    primary, hedge = clients(0.15, 0.0)
+    hedging = policy(budget=0.0, burst=1.0)
+    invoke_model_hedged(PAYLOAD, policy=hedging)
+    assert response_text(invoke_model_hedged(PAYLOAD, policy=hedging)) == 'primary NON-HAZARDOUS'
+    assert (hedging.stats['hedged'], hedging.stats['over_budget']) == (1, 1)
+
+
+def test_streams_race_on_the_first_token(clients):
+    clients(0.5, 0.0, text='fast answer')
+    text = ''.join(invoke_model_stream_hedged(PAYLOAD, policy=policy()))
+    assert text.split() == ['hedge', 'fast', 'answer']
+
+
+def test_hedge_to_a_model_without_prompt_caching_drops_the_marker(clients):
+    primary, hedge = clients(0.5, 0.0)
+    payload = build_cached_payload('x' * 8192, 'Classify this product.', 8)
+    invoke_model_hedged(payload, policy=policy(model_id=OLD_SONNET))
+    assert 'cache_control' in payload['system'][0]
+    assert 'cache_control' not in hedge.bodies[0]['system'][0]
+
+
+def test_deadline_tracks_the_latency_percentile():
+    hedging = HedgePolicy(min_delay=0.1, max_delay=2.0, default_delay=8.0)
+    assert hedging.deadline('model') == 8.0
+    for seconds in [0.5] * 19 + [5.0]:
+        hedging.latencies.record('model', seconds)
+    assert hedging.deadline('model') == 2.0
+    tracker = LatencyTracker()
+    for seconds in range(1, 101):
+        tracker.record('model', seconds / 100)
+    assert tracker.percentile('model', 0.5) == pytest.approx(0.51)
+
+
+def test_identical_concurrent_requests_share_one_call(monkeypatch):
+    fake = FakeBedrockClient(fixed(0.2))
+    monkeypatch.setitem(bedrock._clients, None, fake)
+    flights = SingleFlight()
+    results = []
+
+    def call():
+        results.append(invoke_model_coalesced(PAYLOAD, flights=flights))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake.calls == 1
+    assert flights.stats == {'calls': 8, 'coalesced': 7}
+    assert all(result == results[0] and result is not results[0] for result in results[1:])
+
+
+def test_different_requests_are_not_coalesced(monkeypatch):
+    fake = FakeBedrockClient(fixed(0.0))
+    monkeypatch.setitem(bedrock._clients, None, fake)
+    flights = SingleFlight()
+    invoke_model_coalesced(PAYLOAD, flights=flights)
+    invoke_model_coalesced(build_payload('Classify another product.', 8), flights=flights)
+    assert fake.calls == 2
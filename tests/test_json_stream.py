@@ -0,0 +1,55 @@
+import pytest
+
+from exportedge_common.json_stream import JsonStreamExtractor, extract_json, extract_json_stream
+
+
+def chunks(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"a": 1}', {"a": 1}),
+    ('Here you go:\n```json\n{"a": 1, "b": [1, 2]}\n```', {"a": 1, "b": [1, 2]}),
+    ('```\n{"a": "x"}\n```', {"a": "x"}),
+    ('Use the format {like this}. ```json {"a":1}```', {"a": 1}),
+    ('Example: {"a": 0}\n```json\n{"a": 1}\n```', {"a": 1}),
+    ('```python\nd = {1: 2}\n```\n{"a": 1}', {"a": 1}),
+    ('Sure! {"a": 1} Hope that helps.', {"a": 1}),
+])
+def test_extracts_the_answer_object(text, expected):
+    assert extract_json(text) == expected
+    assert extract_json_stream(chunks(text)) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ('{"note": "line\nbreak"}', {"note": "line\nbreak"}),
+    ('```json\n{"a": "trunc', {"a": "trunc"}),
+    ('{"a": tru', {"a": True}),
+    ('{"a": 12.', {"a": 12}),
+    ('{"a": {"b": 1, "c":', {"a": {"b": 1, "c": None}}),
+    ('{"a": 1, "b"', {"a": 1, "b": None}),
+    ('```json\n{"a": [1, 2\n```', {"a": [1, 2]}),
+])
+def test_repairs_malformed_and_truncated_objects(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_fenced_object_returns_as_soon_as_it_closes():
+    extractor = JsonStreamExtractor()
+    assert extractor.feed('```json\n{"a": ') is None
+    assert extractor.feed('1}') == {"a": 1}
+    assert extractor.done
+
+
+def test_prose_object_waits_for_a_possible_fence():
+    extractor = JsonStreamExtractor()
+    assert extractor.feed('Format: {"a": 0} ') is None
+    assert extractor.feed('```json\n{"a": 1}') == {"a": 1}
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError):
+        extract_json('No JSON here, sorry.')
+    with pytest.raises(ValueError):
+        extract_json('Use the format {like this}.')
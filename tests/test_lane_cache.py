@@ -0,0 +1,27 @@
+import pytest
+
+from lane_cache import lane_key
+
+
+def order(hazard='NON-HAZARDOUS', pickup='Andheri, Mumbai 400069, India'):
+    return {
+        'warehouse_pickup_address': pickup,
+        'customer_delivery_address': '10 Baker St, London, UK',
+        'product_dimensions': '30x20x10 cm',
+        'product_weight': '2 kg',
+        'product_quantity': '1',
+        'hazard_classification': hazard,
+    }
+
+
+def test_orders_on_the_same_lane_share_a_key():
+    assert lane_key(order()) == lane_key(order(pickup='Bandra, Mumbai 400050, India'))
+
+
+def test_hazardous_orders_have_their_own_key():
+    assert lane_key(order('HAZARDOUS')) != lane_key(order('NON-HAZARDOUS'))
+
+
+@pytest.mark.parametrize('hazard', ['', None, 'This product is hazardous because it contains lithium'])
+def test_orders_without_a_clean_hazard_label_are_not_cached(hazard):
+    assert lane_key(order(hazard)) is None
@@ -0,0 +1,94 @@
+import pytest
+
+from exportedge_common.measurements import (
+    parse_days, parse_dimensions, parse_measurements, parse_price, parse_quantity, parse_weight
+)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('30x20x10 cm', (30.0, 20.0, 10.0)),
+    ('30 x 20 x 10', (30.0, 20.0, 10.0)),
+    ('1,200x800x600mm', (120.0, 80.0, 60.0)),
+    ('12 in x 8 in x 4 in', (30.48, 20.32, 10.16)),
+    ('L 30cm W 20cm H 10cm', (30.0, 20.0, 10.0)),
+    ('15.6 inch laptop, 35x25x2 cm', (35.0, 25.0, 2.0)),
+    ('Laptop,35x25x2 cm', (35.0, 25.0, 2.0)),
+])
+def test_parse_dimensions(value, expected):
+    assert parse_dimensions(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value', ['30x20', '35x25x2 parsecs', '-30x20x10 cm', '0x20x10 cm', 'large box', '30,5 x 20 x 10 cm'])
+def test_parse_dimensions_rejects(value):
+    with pytest.raises(ValueError):
+        parse_dimensions(value)
+
+
+@pytest.mark.parametrize('value, expected', [('2.5 kg', 2.5), ('800g', 0.8), ('3 lbs', 1.360777), ('5', 5.0), ('1,250 kg', 1250.0)])
+def test_parse_weight(value, expected):
+    assert parse_weight(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value', ['5 tons', '-2 kg', '0 kg', 'heavy', '2,5 kg', '25,00 kg'])
+def test_parse_weight_rejects(value):
+    with pytest.raises(ValueError):
+        parse_weight(value)
+
+
+@pytest.mark.parametrize('value, expected', [('10', 10), ('10 units', 10), ('1,000 pcs', 1000), ('2.0', 2), (3, 3)])
+def test_parse_quantity(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize('value', ['-3', '0', '2.7', '10 boxes of 12', 'some', '1,00'])
+def test_parse_quantity_rejects(value):
+    with pytest.raises(ValueError):
+        parse_quantity(value)
+
+
+@pytest.mark.parametrize('value, expected', [('₹1,299.50', '1299.50'), ('$40', '40'), ('4200 INR', '4200'),
+                                             ('₹1,29,999', '129999'), (450.0, '450.0')])
+def test_parse_price(value, expected):
+    assert str(parse_price(value)) == expected
+
+
+@pytest.mark.parametrize('value, expected', [('3-5 days', 4.0), ('3 to 5 days', 4.0), ('2 days', 2.0), ('1–2', 1.5)])
+def test_parse_days(value, expected):
+    assert parse_days(value) == expected
+
+
+@pytest.mark.parametrize('value', ['soon', None, ''])
+def test_parse_days_rejects(value):
+    with pytest.raises(ValueError):
+        parse_days(value)
+
+
+def test_parse_measurements_flags_invalid_fields():
+    measurements = parse_measurements({
+        'product_dimensions': '50x40x30 cm',
+        'product_weight': '5 tons',
+        'product_quantity': '2',
+    })
+    assert measurements['invalid'] == ['product_weight']
+    assert measurements['volumetric_weight_kg'] == pytest.approx(24.0)
+    assert measurements['chargeable_weight_kg'] is None
+
+
+def test_invalid_quantity_gives_no_totals():
+    measurements = parse_measurements({
+        'product_dimensions': '50x40x30 cm',
+        'product_weight': '5 kg',
+        'product_quantity': '2.7',
+    })
+    assert measurements['invalid'] == ['product_quantity']
+    assert measurements['quantity'] is None
+    assert measurements['volumetric_weight_kg'] is None
+    assert measurements['total_weight_kg'] is None
+    assert measurements['chargeable_weight_kg'] is None
+
+
+def test_missing_quantity_means_one_unit():
+    measurements = parse_measurements({'product_dimensions': '50x40x30 cm', 'product_weight': '30 kg'})
+    assert measurements['quantity'] == 1
+    assert measurements['chargeable_weight_kg'] == pytest.approx(30.0)
+    assert measurements['invalid'] == []
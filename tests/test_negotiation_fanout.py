@@ -0,0 +1,109 @@
+import json
+import re
+
+import pytest
+
+import negotiation_fanout
+from exportedge_common import bedrock
+from exportedge_common.fakes import FakeBedrockClient
+from negotiation_fanout import negotiate_all, rank_options
+
+OPTIONS = [
+    {"carrier": "FedEx", "option_type": "Urgent", "price": "900.00", "delivery_time": "1-2 days",
+     "co2_emissions": "40.00 kg", "co2_kg": 40.0, "mode": "Air"},
+    {"carrier": "DHL", "option_type": "Cost-effective", "price": "500.00", "delivery_time": "8-10 days",
+     "co2_emissions": "5.00 kg", "co2_kg": 5.0, "mode": "Sea"},
+    {"carrier": "BlueDart", "option_type": "Balanced", "price": "700.00", "delivery_time": "3-5 days",
+     "co2_emissions": "20.00 kg", "co2_kg": 20.0, "mode": "Air"},
+    {"carrier": "Aramex", "option_type": "Best Option", "price": "650.00", "delivery_time": "4-6 days",
+     "co2_emissions": "12.00 kg", "co2_kg": 12.0, "mode": "Road"},
+]
+
+
+class CarrierClient(FakeBedrockClient):
+    """Fake that answers each carrier's negotiation with its own price, raises for
+    the ``failing`` carriers and records the peak number of concurrent calls."""
+
+    def __init__(self, prices, failing=(), latency=0.1):
+        super().__init__(lambda: latency)
+        self.prices = prices
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.peak = 0
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType=None, accept=None):
+        carrier = re.search(r'Carrier: ([^,]+),', body).group(1)
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            self._admit()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        if carrier in self.failing:
+            raise RuntimeError(f"{carrier} is unavailable")
+        reply = {"carrier": carrier, "negotiated_price": self.prices[carrier], "discount": "10%",
+                 "reasoning": "Bulk order.", "chat": [{"speaker": "Seller", "message": "Any discount?"}]}
+        text = '```json\n' + json.dumps(reply) + '\n```'
+        return {'body': iter([self._chunk({'type': 'content_block_delta',
+                                           'delta': {'type': 'text_delta', 'text': text}})])}
+
+
+@pytest.fixture(autouse=True)
+def unlimited_rate(monkeypatch):
+    monkeypatch.setattr(bedrock, 'rate_limiter', bedrock.TokenBucket(rate=1e6, capacity=1e6))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(**kwargs):
+        fake = CarrierClient({"FedEx": "₹450", "DHL": "₹480", "BlueDart": "₹630", "Aramex": "₹600"}, **kwargs)
+        monkeypatch.setitem(bedrock._clients, None, fake)
+        return fake
+    return install
+
+
+def test_carriers_are_negotiated_concurrently_up_to_the_limit(client, monkeypatch):
+    monkeypatch.setattr(negotiation_fanout, 'MAX_CONCURRENCY', 2)
+    fake = client()
+    negotiated_prices, chat, _ = negotiate_all(OPTIONS, 'Bulk Quantity: 200 units.')
+    assert fake.calls == 4
+    assert fake.peak == 2
+    assert [p['negotiated_price'] for p in negotiated_prices] == ["₹450", "₹480", "₹630", "₹600"]
+    assert all(chat[option['carrier']] for option in OPTIONS)
+
+
+def test_a_failing_carrier_keeps_its_original_price(client):
+    client(failing={'FedEx'})
+    negotiated_prices, chat, recommendation = negotiate_all(OPTIONS, 'Bulk Quantity: 200 units.')
+    assert negotiated_prices[0] == {
+        "carrier": "FedEx", "option_type": "Urgent", "original_price": "900.00", "negotiated_price": "900.00",
+        "discount": "0%", "reasoning": "Negotiation unavailable; original price kept."
+    }
+    assert chat['FedEx'] == []
+    assert [p['negotiated_price'] for p in negotiated_prices[1:]] == ["₹480", "₹630", "₹600"]
+    # Back at its full price, FedEx is no longer the best balance
+    assert recommendation['carrier'] == 'Aramex'
+
+
+def test_the_recommendation_uses_negotiated_prices(client):
+    client()
+    _, _, recommendation = negotiate_all(OPTIONS, 'Bulk Quantity: 200 units.')
+    assert (recommendation['carrier'], recommendation['negotiated_price']) == ('FedEx', "₹450")
+
+
+def test_prime_weights_delivery_time_higher():
+    negotiated = [{"negotiated_price": option['price']} for option in OPTIONS]
+    assert rank_options(OPTIONS, negotiated)['carrier'] == 'DHL'
+    assert rank_options(OPTIONS, negotiated, is_prime=True)['carrier'] == 'Aramex'
+
+
+def test_unparseable_values_fall_back_or_rank_worst():
+    # An unreadable negotiated price falls back to the original one
+    assert rank_options([OPTIONS[1]], [{"negotiated_price": "call us"}])['carrier'] == 'DHL'
+    # Otherwise identical, the option with an unknown delivery time ranks worst
+    options = [dict(OPTIONS[3], carrier='DHL', delivery_time='TBD'), OPTIONS[3]]
+    negotiated = [{"negotiated_price": "650.00"}, {"negotiated_price": "650.00"}]
+    assert rank_options(options, negotiated)['carrier'] == 'Aramex'
+    assert rank_options([], []) == "No recommendation provided."
@@ -0,0 +1,173 @@
+import copy
+import re
+import threading
+import time
+
+import pytest
+
+from exportedge_common.pipeline import MERGE_ALL, Node, Pipeline, StageError
+from OrderPipeline import order_pipeline
+
+
+def names(waves):
+    return [[node.name for node in wave] for wave in waves]
+
+
+def test_order_pipeline_runs_independent_stages_together():
+    assert names(order_pipeline.levels()) == [
+        ['ExtractOrderDetails'],
+        ['HazardClassification', 'CustomerPricingLogic'],
+        ['CarrierPricing'],
+        ['NegotiationWithCarrier'],
+        ['NeptuneIntegration', 'GenerateArtifact'],
+    ]
+
+
+def test_independent_nodes_overlap_and_outputs_are_merged():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def stage(field, value):
+        def handler(event, context):
+            both_running.wait()
+            event[field] = value
+            event['stage_timings'] = {field: {'duration_ms': 1.0}}
+            return event
+        return handler
+
+    pipeline = Pipeline([
+        Node('Extract', lambda event, context: {**event, 'product': 'kettle'}, outputs=(MERGE_ALL,)),
+        Node('Hazard', stage('hazard', 'NON-HAZARDOUS'), inputs=('product',), outputs=('hazard',)),
+        Node('Price', stage('price', '10.00'), inputs=('product',), outputs=('price',)),
+        Node('Quote', lambda event, context: {'quote': f"{event['hazard']} {event['price']}"},
+             inputs=('hazard', 'price'), outputs=('quote',)),
+    ])
+    event = pipeline.run({'order_id': '1'})
+    assert event['quote'] == 'NON-HAZARDOUS 10.00'
+    assert set(event['stage_timings']) == {'hazard', 'price'}
+
+
+def test_stage_errors_stop_the_order():
+    pipeline = Pipeline([Node('Broken', lambda event, context: {'status': 'error', 'message': 'boom'},
+                              outputs=('x',))])
+    with pytest.raises(StageError, match='Broken: boom'):
+        pipeline.run({})
+
+
+@pytest.mark.parametrize('prediction, reruns', [('NON-HAZARDOUS', 0), ('HAZARDOUS', 1)])
+def test_speculative_stage_is_rerun_only_on_a_wrong_prediction(prediction, reruns):
+    calls = []
+
+    def price(event, context):
+        calls.append(event['hazard'])
+        return {'price': 'hazmat' if event['hazard'] == 'HAZARDOUS' else 'standard'}
+
+    pipeline = Pipeline([
+        Node('Hazard', lambda event, context: {'hazard': 'NON-HAZARDOUS'}, outputs=('hazard',)),
+        Node('Price', price, inputs=('hazard',), outputs=('price',), speculate={'hazard': lambda event: prediction}),
+    ])
+    assert pipeline.run({})['price'] == 'standard'
+    # A missed speculation that had not started yet is cancelled instead of run
+    assert len(calls) == 1 + reruns - pipeline.speculation_stats['cancelled']
+    assert pipeline.speculation_stats['misses'] == reruns
+
+
+def test_a_running_missed_speculation_finishes_and_counts_as_wasted():
+    hazard_done = threading.Event()
+    calls = []
+
+    def hazard(event, context):
+        hazard_done.wait(5)
+        return {'hazard': 'NON-HAZARDOUS'}
+
+    def price(event, context):
+        calls.append(event['hazard'])
+        if event['hazard'] == 'HAZARDOUS':
+            # Still running when the real classification arrives
+            hazard_done.set()
+            time.sleep(0.1)
+        return {'price': event['hazard']}
+
+    pipeline = Pipeline([
+        Node('Hazard', hazard, outputs=('hazard',)),
+        Node('Price', price, inputs=('hazard',), outputs=('price',), speculate={'hazard': lambda event: 'HAZARDOUS'}),
+    ])
+    assert pipeline.run({})['price'] == 'NON-HAZARDOUS'
+    assert sorted(calls) == ['HAZARDOUS', 'NON-HAZARDOUS']
+    assert pipeline.speculation_stats['cancelled'] == 0
+    assert pipeline.speculation_stats['wasted_seconds'] >= 0.05
+
+
+def test_state_machine_uses_parallel_states_for_concurrent_waves():
+    definition = order_pipeline.state_machine()
+    parallel = definition['States']['Parallel_HazardClassification_CustomerPricingLogic']
+    assert [branch['StartAt'] for branch in parallel['Branches']] == ['HazardClassification', 'CustomerPricingLogic']
+    assert definition['StartAt'] == 'WrapEvent'
+    assert definition['States']['WrapEvent']['Next'] == 'ExtractOrderDetails'
+
+
+def _path(data, path):
+    for key, index in re.findall(r'\.(\w+)(?:\[(\d+)\])?', path):
+        data = data[key] if index == '' else data[key][int(index)]
+    return data
+
+
+def _evaluate(data, expression):
+    if not expression.startswith('States.JsonMerge('):
+        return copy.deepcopy(_path(data, expression))
+    body, depth, args, start = expression[len('States.JsonMerge('):-1], 0, [], 0
+    for i, char in enumerate(body):
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == ',' and depth == 0:
+            args.append(body[start:i].strip())
+            start = i + 1
+    return {**_evaluate(data, args[0]), **_evaluate(data, args[1])}
+
+
+def _set(data, path, value):
+    if path == '$':
+        return value
+    data = copy.deepcopy(data)
+    data[path[2:]] = value
+    return data
+
+
+def simulate(definition, handlers, data):
+    """Run the subset of Amazon States Language that ``Pipeline.state_machine`` emits."""
+    state_name = definition['StartAt']
+    while True:
+        state = definition['States'][state_name]
+        state_input = _path(data, state.get('InputPath', '$'))
+        if state['Type'] == 'Pass':
+            result = {key[:-2]: _evaluate(state_input, value) for key, value in state['Parameters'].items()}
+        elif state['Type'] == 'Task':
+            result = handlers[state['Resource']](copy.deepcopy(state_input), None)
+        else:
+            result = [simulate(branch, handlers, state_input) for branch in state['Branches']]
+        if 'ResultSelector' in state:
+            result = {key[:-2]: _evaluate(result, value) for key, value in state['ResultSelector'].items()}
+        data = _path(_set(data, state.get('ResultPath', '$'), result), state.get('OutputPath', '$'))
+        if state.get('End'):
+            return data
+        state_name = state['Next']
+
+
+def test_state_machine_merges_outputs_without_leaking_updates():
+    seen = []
+
+    def stage(**outputs):
+        def handler(event, context):
+            seen.append(event)
+            return {**event, **outputs}
+        return handler
+
+    pipeline = Pipeline([
+        Node('Extract', lambda event, context: {**event, 'product': 'kettle'}, outputs=(MERGE_ALL,)),
+        Node('Hazard', stage(hazard='NON-HAZARDOUS'), inputs=('product',), outputs=('hazard',)),
+        Node('Price', stage(price='10.00'), inputs=('product',), outputs=('price',)),
+        Node('Quote', stage(quote='ok'), inputs=('hazard', 'price'), outputs=('quote',)),
+    ])
+    handlers = {f"${{{node.name}Arn}}": node.handler for node in pipeline.nodes}
+    event = simulate(pipeline.state_machine(), handlers, {'order_id': '1'})
+    assert event == pipeline.run({'order_id': '1'})
+    assert event == {'order_id': '1', 'product': 'kettle', 'hazard': 'NON-HAZARDOUS', 'price': '10.00', 'quote': 'ok'}
+    assert not any('_updates' in stage_input for stage_input in seen)
@@ -0,0 +1,44 @@
+import pytest
+
+from exportedge_common.measurements import parse_price
+from pricing_rules import price_order, price_orders
+
+
+def order(price='₹1,000.00', quantity='2', prime='No'):
+    return {'product_price': price, 'product_quantity': quantity, 'customer_prime_member': prime}
+
+
+def test_prime_members_get_ten_percent_and_express():
+    assert price_order(order(prime='Yes')) == {
+        "final_price": "1800.00", "delivery_type": "Express", "discount_applied": "10%"
+    }
+
+
+def test_standard_orders_pay_full_price():
+    assert price_order(order(quantity='3 units')) == {
+        "final_price": "3000.00", "delivery_type": "Standard", "discount_applied": "0%"
+    }
+
+
+def test_rounds_half_up_to_cents():
+    assert price_order(order(price='$0.125', quantity='1'))['final_price'] == '0.13'
+
+
+@pytest.mark.parametrize('quantity', ['-2', '0', '2.7', 'many'])
+def test_rejects_invalid_quantities(quantity):
+    with pytest.raises(ValueError):
+        price_order(order(quantity=quantity))
+
+
+@pytest.mark.parametrize('price', ['TBD', '$-40', '-15', '0.00'])
+def test_rejects_non_positive_or_missing_prices(price):
+    with pytest.raises(ValueError):
+        parse_price(price)
+    assert price_orders([order(price=price)]) == [{"error": f"Invalid price: {price!r}"}]
+
+
+def test_batch_reports_errors_per_order():
+    priced = price_orders([order(), order(quantity='-2'), order(prime='y')])
+    assert priced[0]['final_price'] == '2000.00'
+    assert priced[1] == {"error": "Invalid quantity: '-2'"}
+    assert priced[2]['final_price'] == '1800.00'
@@ -0,0 +1,56 @@
+import pytest
+
+import CarrierPricing
+from rate_engine import OPTION_TYPES, quote_order, quote_orders, rate_card
+
+
+def order(destination, hazard='NON-HAZARDOUS', weight='2 kg'):
+    return {
+        'warehouse_pickup_address': 'Andheri, Mumbai, India',
+        'customer_delivery_address': destination,
+        'product_dimensions': '30x20x10 cm',
+        'product_weight': weight,
+        'product_quantity': '1',
+        'hazard_classification': hazard,
+    }
+
+
+@pytest.mark.parametrize('destination', ['10 Baker St, London, UK', '1 George St, Sydney, Australia',
+                                         '5th Ave, New York, USA'])
+@pytest.mark.parametrize('hazard', ['NON-HAZARDOUS', 'HAZARDOUS'])
+def test_each_option_type_uses_a_different_carrier(destination, hazard):
+    options = quote_order(order(destination, hazard))
+    carriers = [option['carrier'] for option in options]
+    assert [option['option_type'] for option in options] == list(OPTION_TYPES)
+    assert len(carriers) == len(set(carriers))
+
+
+def test_hazardous_orders_only_use_hazmat_services():
+    hazmat_services = {(c, s) for c, s, ok in zip(rate_card.carriers, rate_card.services, rate_card.hazmat_allowed)
+                       if ok}
+    for option in quote_order(order('London, UK', 'HAZARDOUS')):
+        assert (option['carrier'], option['service']) in hazmat_services
+
+
+def test_cost_effective_is_the_cheapest_option():
+    options = quote_order(order('Sydney, Australia'))
+    prices = {option['option_type']: float(option['price']) for option in options}
+    assert prices['Cost-effective'] == min(prices.values())
+
+
+def test_lanes_off_the_card_are_not_priced():
+    assert quote_orders([order('Berlin, Germany'), order('London, UK')])[0] is None
+
+
+@pytest.mark.parametrize('hazard', ['', None, 'This product is hazardous because it contains lithium', 'UNKNOWN'])
+def test_orders_without_a_clean_hazard_label_are_not_priced(hazard):
+    assert quote_order(order('London, UK', hazard)) is None
+
+
+def test_batch_mode_honours_the_bedrock_engine(monkeypatch):
+    model_quote = {"shipping_options": [{"carrier": "DHL", "price": "100.00", "mode": "Air"}]}
+    monkeypatch.setattr(CarrierPricing, 'PRICING_ENGINE', 'bedrock')
+    monkeypatch.setattr(CarrierPricing, 'cached_quote', lambda order, loader: loader())
+    monkeypatch.setattr(CarrierPricing, 'price_with_model', lambda order: model_quote)
+    event = CarrierPricing.lambda_handler({'orders': [order('London, UK')]}, None)
+    assert [q['shipping_options'][0]['carrier'] for q in event['quoted_orders']] == ['DHL']
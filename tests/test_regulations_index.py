@@ -0,0 +1,70 @@
+import json
+import struct
+import tempfile
+
+import pytest
+
+import regulations_index
+from regulations_index import HEADER, RegulationsIndex, build_index
+
+PASSAGES = [
+    {"id": "us-isf", "country": "USA", "title": "Importer Security Filing (ISF 10+2)",
+     "text": "Ocean shipments to the USA need an ISF filed 24 hours before loading.", "source": "CBP"},
+    {"id": "us-battery", "country": "USA", "title": "Lithium batteries by air",
+     "text": "Lithium battery shipments by air follow IATA packing instructions; lithium cells need a UN38.3 "
+             "test summary and lithium battery marks.", "source": "PHMSA"},
+    {"id": "uk-ukca", "country": "UK", "title": "UKCA marking for electronics",
+     "text": "Electronics sold in Great Britain need UKCA or CE marking.", "source": "GOV.UK"},
+    {"id": "au-ecta", "country": "Australia", "title": "India-Australia ECTA certificate of origin",
+     "text": "A certificate of origin under ECTA gives Indian goods preferential duty in Australia.", "source": "DFAT"},
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    path.write_text('\n'.join(json.dumps(p) for p in PASSAGES) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_build_load_query_round_trip(corpus, tmp_path):
+    index = RegulationsIndex(build_index(corpus, str(tmp_path / 'test.idx')))
+    assert index.n_docs == len(PASSAGES)
+    assert index.passages == PASSAGES
+    assert [p['id'] for _, p in index.search('ISF 10+2 filing', k=1)] == ['us-isf']
+    assert index.search('customs tariff zebra') == []
+
+
+def test_postings_are_little_endian_on_disk(corpus, tmp_path):
+    path = build_index(corpus, str(tmp_path / 'test.idx'))
+    index = RegulationsIndex(path)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    meta_len = HEADER.unpack_from(raw)[-1]
+    start = HEADER.size + meta_len + (-(HEADER.size + meta_len) % 4)
+    assert list(index.doc_lengths) == list(struct.unpack_from(f'<{len(PASSAGES)}I', raw, start))
+    df, offset = index.terms['lithium']
+    assert df == 1
+    # Doc 1: twice in the (double-weighted) title, three times in the text
+    assert index.postings[2 * offset:2 * offset + 2] == (1, 5)
+
+
+def test_results_are_the_top_k_by_score(corpus, tmp_path):
+    index = RegulationsIndex(build_index(corpus, str(tmp_path / 'test.idx')))
+    results = index.search('lithium battery electronics export to the USA', k=2)
+    assert len(results) == 2
+    assert results[0][1]['id'] == 'us-battery'
+    assert results[0][0] >= results[1][0]
+    every = index.search('lithium battery electronics export to the USA', k=len(PASSAGES))
+    assert results == every[:2]
+    assert [score for score, _ in every] == sorted((score for score, _ in every), reverse=True)
+
+
+def test_index_is_built_into_tmp_when_not_packaged(monkeypatch, tmp_path):
+    monkeypatch.setattr(regulations_index, 'INDEX_PATH', str(tmp_path / 'missing' / 'export_regulations.idx'))
+    monkeypatch.setattr(regulations_index, '_index', None)
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    index = regulations_index.get_index()
+    assert (tmp_path / 'export_regulations.idx').exists()
+    assert index is regulations_index.get_index()
+    assert index.search('what is ISF 10+2')[0][1]['country'] == 'USA'
@@ -0,0 +1,58 @@
+import http.client
+import importlib
+import json
+import threading
+
+import pytest
+
+from exportedge_common.streaming import STREAM_HEADERS, make_server, sse_event, sse_response
+
+compliance_lambda = importlib.import_module('lambda')
+
+
+@pytest.fixture
+def server():
+    def handler(event, context):
+        if json.loads(event['body']).get('stream'):
+            return sse_response(sse_event({"text": word}, event='delta') for word in ('Hello', 'world'))
+        return {"statusCode": 400, "headers": {"Content-Type": "application/json"}, "body": '{"error": "bad"}'}
+
+    httpd = make_server(handler, port=0, host='127.0.0.1')
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(port, body):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    connection.request('POST', '/', body=json.dumps(body), headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_streams_frames_with_stream_headers(server):
+    response, data = post(server, {"stream": True})
+    assert response.status == 200
+    assert response.getheader('Content-Type') == STREAM_HEADERS['Content-Type']
+    assert response.getheader('Transfer-Encoding') == 'chunked'
+    assert data == b'event: delta\ndata: {"text": "Hello"}\n\nevent: delta\ndata: {"text": "world"}\n\n'
+
+
+def test_buffered_response_keeps_status_and_headers(server):
+    response, data = post(server, {})
+    assert response.status == 400
+    assert json.loads(data) == {"error": "bad"}
+
+
+def test_fallback_returns_the_full_lambda_response():
+    response = compliance_lambda.stream_handler({"body": json.dumps({"user_input": ""})}, None)
+    assert response['statusCode'] == 500
+    assert response['headers']['Content-Type'] == 'application/json'
+    assert json.loads(response['body'])['error'] == "Input message is empty."
+
+
+def test_stream_requests_get_sse_frames():
+    response = compliance_lambda.stream_handler({"body": json.dumps({"user_input": "", "stream": True})}, None)
+    assert response['headers'] == STREAM_HEADERS
+    assert b'event: error' in b''.join(response['body'])
@@ -0,0 +1,65 @@
+import json
+import re
+
+import pytest
+
+import CustomerPricingLogic
+from exportedge_common import bedrock, telemetry
+from exportedge_common.fakes import FakeBedrockClient
+from exportedge_common.telemetry import FileExporter, estimate_cost, instrument_stage, record_llm_call
+from OrderPipeline import ORDER_NODES
+
+
+@pytest.fixture
+def records(tmp_path, monkeypatch):
+    path = tmp_path / 'telemetry.jsonl'
+    monkeypatch.setattr(telemetry, 'exporter', FileExporter(str(path)))
+
+    def read():
+        return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+    return read
+
+
+def test_llm_calls_are_written_as_emf_records(records):
+    record_llm_call('anthropic.claude-3-5-sonnet-20241022-v2:0', 120.0,
+                    {'input_tokens': 1000, 'output_tokens': 100}, retries=1, stage='CarrierPricing')
+    [record] = records()
+    assert record['Stage'] == 'CarrierPricing'
+    assert record['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Stage', 'ModelId']]
+    assert (record['InputTokens'], record['OutputTokens'], record['Retries']) == (1000, 100, 1)
+    assert record['EstimatedCostUSD'] == pytest.approx(0.0045)
+
+
+def test_cache_reads_bill_at_a_tenth_of_input():
+    assert estimate_cost('anthropic.claude-3-haiku-20240307-v1:0', 0, 0, cache_read_tokens=1_000_000) == \
+        pytest.approx(0.025)
+    assert estimate_cost('unknown-model', 1000, 1000) == 0.0
+
+
+def test_stage_summary_counts_calls_made_by_the_handler(records, monkeypatch):
+    monkeypatch.setitem(bedrock._clients, None, FakeBedrockClient(latency=lambda: 0.0, text='ok'))
+
+    @instrument_stage('HazardClassification')
+    def handler(event, context):
+        bedrock.invoke_model(bedrock.build_payload('Classify this product.', 8))
+        return event
+
+    event = handler({}, None)
+    summary = event['stage_timings']['HazardClassification']
+    assert summary['llm_calls'] == 1
+    assert summary['output_tokens'] == 1
+    assert {r['Stage'] for r in records()} == {'HazardClassification'}
+
+
+def test_customer_pricing_reports_under_its_node_name(records):
+    event = CustomerPricingLogic.lambda_handler(
+        {'product_price': '100', 'product_quantity': '1', 'customer_prime_member': 'No'}, None
+    )
+    assert list(event['stage_timings']) == ['CustomerPricingLogic']
+
+
+@pytest.mark.parametrize('node', [node for node in ORDER_NODES], ids=lambda node: node.name)
+def test_instrumented_stages_use_their_pipeline_node_name(node):
+    with open(node.path) as f:
+        stages = re.findall(r"@instrument_stage\('([^']+)'", f.read())
+    assert stages in ([], [node.name])